@@ -0,0 +1,92 @@
+import settings
+
+
+def align_to_stride(value, stride=None):
+    """
+    Membulatkan ukuran ke kelipatan stride model terdekat (minimal satu stride).
+    """
+    stride = stride or settings.MODEL_STRIDE
+    return max(stride, int(value / stride + 0.5) * stride)
+
+
+def aligned_size(width, height, long_side, stride=None):
+    """
+    Menghitung (lebar, tinggi) dengan sisi terpanjang sekitar long_side, rasio aspek dipertahankan,
+    dan kedua sisi kelipatan stride, sehingga letterbox ultralytics tidak perlu mengubah ukuran lagi.
+    """
+    scale = long_side / max(width, height)
+    return align_to_stride(width * scale, stride), align_to_stride(height * scale, stride)
+
+
+class AdaptiveResolutionController:
+    """
+    Pengendali resolusi proses dan laju inferensi webcam berdasarkan latensi end-to-end
+    (sejak frame diserahkan sampai hasil deteksinya siap).
+    Jika latensi rata-rata (EMA) melebihi target, resolusi diturunkan dulu, lalu laju inferensi;
+    jika jauh di bawah target, laju inferensi dinaikkan dulu, lalu resolusi.
+    Perubahan hanya dilakukan setelah cooldown beberapa sampel agar tidak berosilasi.
+    """
+
+    def __init__(self, target_latency_ms=None, levels=None, min_fps=None, max_fps=None,
+                 stride=None):
+        self.target_seconds = (target_latency_ms or settings.ADAPTIVE_TARGET_LATENCY_MS) / 1000
+        self.levels = sorted(levels or settings.ADAPTIVE_RESOLUTION_LEVELS)
+        self.min_fps = min_fps or settings.ADAPTIVE_MIN_FPS
+        self.max_fps = max_fps or settings.ADAPTIVE_MAX_FPS
+        self.stride = stride or settings.MODEL_STRIDE
+        self.level = len(self.levels) - 1
+        self.target_fps = self.max_fps
+        self.latency_ema = None
+        self._cooldown = 0
+
+    @property
+    def long_side(self):
+        return self.levels[self.level]
+
+    def observe(self, latency_seconds):
+        """
+        Mencatat satu latensi end-to-end dan menyesuaikan level bila perlu.
+        """
+        alpha = settings.ADAPTIVE_EMA_ALPHA
+        if self.latency_ema is None:
+            self.latency_ema = latency_seconds
+        else:
+            self.latency_ema = alpha * latency_seconds + (1 - alpha) * self.latency_ema
+
+        if self._cooldown > 0:
+            self._cooldown -= 1
+            return
+        if self.latency_ema > self.target_seconds * settings.ADAPTIVE_HIGH_RATIO:
+            self._step_down()
+        elif self.latency_ema < self.target_seconds * settings.ADAPTIVE_LOW_RATIO:
+            self._step_up()
+
+    def _step_down(self):
+        if self.level > 0:
+            self.level -= 1
+        elif self.target_fps > self.min_fps:
+            self.target_fps -= 1
+        else:
+            return
+        self._cooldown = settings.ADAPTIVE_COOLDOWN_SAMPLES
+
+    def _step_up(self):
+        if self.target_fps < self.max_fps:
+            self.target_fps += 1
+        elif self.level < len(self.levels) - 1:
+            self.level += 1
+        else:
+            return
+        self._cooldown = settings.ADAPTIVE_COOLDOWN_SAMPLES
+
+    def resize_dim(self, width, height):
+        """
+        Mengembalikan (lebar, tinggi) proses untuk frame berukuran width x height pada level saat ini.
+        Frame tidak pernah diperbesar.
+        """
+        long_side = min(self.long_side, max(width, height))
+        return aligned_size(width, height, long_side, self.stride)
+
+    def describe(self):
+        latency = f"{self.latency_ema * 1000:.0f} ms" if self.latency_ema is not None else "-"
+        return f"sisi {self.long_side}px, {self.target_fps} FPS, latensi {latency}"
@@ -1,19 +1,27 @@
 import streamlit as st
-import sqlite3
-from datetime import datetime
-import io
-import cv2
+from concurrent.futures import FIRST_COMPLETED, wait
+from datetime import datetime, timedelta
 import av
 import PIL.Image as Image
-import numpy as np
 from streamlit_webrtc import webrtc_streamer, WebRtcMode, RTCConfiguration, VideoProcessorBase
 import settings  # Asumsi file settings.py ada dan berisi DEFAULT_IMAGE, DEFAULT_DETECT_IMAGE, DETECTION_MODEL
-from ultralytics import YOLO
+import model_registry
+import model_export
+import metrics
+import inference
+import overlay
+import frame_sources
+import tracking
+import tiling
+import adaptive
+import helper
+import result_cache
+import explanations
 import google.generativeai as genai
 import os
 from google import generativeai as genai
-from fpdf import FPDF
-import tempfile
+import report
+import storage
 
 # Konfigurasi WebRTC
 RTC_CONFIGURATION = RTCConfiguration(
@@ -21,88 +29,58 @@ RTC_CONFIGURATION = RTCConfiguration(
 )
 
 
-def clean_markdown(text):
-    """Membersihkan format markdown dari teks untuk output PDF."""
-    text = text.replace('**', '')
-    text = text.replace('*', '')
-    text = text.replace('#', '')
-    text = text.replace('`', '')
-    return text
-
-
-def create_detection_pdf(image, label, confidence, explanation):
+@st.cache_data(max_entries=settings.PDF_CACHE_SIZE, show_spinner=False)
+def build_detection_report(detection_id, label, confidence, explanation, _detected_image):
     """
-    Membuat file PDF yang berisi hasil deteksi, gambar, dan penjelasan.
+    Membangun laporan PDF di thread pool laporan; hasilnya di-cache per (id deteksi, label, confidence).
     """
-    try:
-        pdf = FPDF()
-        pdf.add_page()
-
-        pdf.set_font('Arial', 'B', 18)
-        pdf.cell(190, 10, 'Hasil Deteksi Penyakit Daun Padi', 0, 1, 'C')
-        pdf.ln(10)
-
-        current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        pdf.cell(190, 10, f'Waktu Deteksi: {current_time}', 0, 1)
-        pdf.ln(5)
-
-        pdf.set_font('Arial', 'B', 14)
-        # Mengubah format confidence menjadi persentase
-        pdf.cell(190, 10, f'Penyakit Terdeteksi: {label}', 0, 1)
-        pdf.cell(190, 10, f'Tingkat Kepercayaan: {confidence:.0%}', 0, 1) # Mengubah format ke persen
-        pdf.ln(5)
-
-        # Simpan gambar sementara untuk dimasukkan ke PDF
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as temp_file:
-            temp_filename = temp_file.name
-            image.save(temp_file, format='PNG')  # Menggunakan temp_file langsung
-
-        pdf.cell(190, 10, 'Gambar Daun Padi:', 0, 1)
-        pdf.image(temp_filename, x=10, y=None, w=180)
-        os.unlink(temp_filename)  # Hapus file sementara
-
-        pdf.add_page()
-        pdf.set_font('Arial', 'B', 16)
-        pdf.cell(190, 10, 'Analisis dan Rekomendasi:', 0, 1)
-        pdf.ln(5)
-
-        pdf.set_font('Arial', '', 14)
-        explanation_lines = explanation.split('\n')
-
-        current_mode = 'normal'
-        for line in explanation_lines:
-            clean_line = clean_markdown(line)
-
-            # Deteksi judul bagian dalam penjelasan
-            if "Penjelasan:" in clean_line or "Dampak:" in clean_line or "Rekomendasi" in clean_line:
-                pdf.ln(5)
-                pdf.set_font('Arial', 'B', 14)
-                current_mode = 'title'
-            elif clean_line.strip() == "":
-                pdf.ln(5)
-                pdf.set_font('Arial', '', 14)
-                current_mode = 'normal'
-            else:
-                if current_mode == 'title':
-                    pdf.set_font('Arial', '', 14)
-                    current_mode = 'normal'
-
-            pdf.multi_cell(0, 6, clean_line)
+    with metrics.span('pdf_detection_report'):
+        image_bytes = report.encode_jpeg(_detected_image)
+        return report.get_executor().submit(
+            report.create_detection_pdf, image_bytes, label, confidence, explanation).result()
 
-        # Simpan PDF sementara dan baca isinya
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_pdf_file:
-            temp_pdf_filename = temp_pdf_file.name
-            pdf.output(temp_pdf_filename)
 
-        with open(temp_pdf_filename, 'rb') as f:
-            pdf_data = f.read()
-
-        os.unlink(temp_pdf_filename)  # Hapus file PDF sementara
-        return pdf_data
+@st.cache_data(max_entries=settings.PDF_CACHE_SIZE, show_spinner=False)
+def build_consolidated_report(detection_id, explanation_items, _result, _names):
+    """
+    Membangun satu laporan PDF gabungan untuk semua kotak pada satu gambar; di-cache per
+    (id deteksi, penjelasan per label).
+    """
+    detections = _result['detections']
+    boxes = [(_names[c], conf, tuple(xyxy))
+             for c, conf, xyxy in zip(detections.cls.tolist(), detections.conf.tolist(),
+                                      detections.xyxy.tolist())]
+    with metrics.span('pdf_consolidated_report'):
+        image_bytes = report.encode_jpeg(_result['detected_image'])
+        return report.get_executor().submit(
+            report.create_consolidated_pdf, image_bytes, boxes, dict(explanation_items)).result()
+
+
+def show_report_download(report_key, build_report, file_prefix, key,
+                         prepare_label="📄 Siapkan Laporan PDF"):
+    """
+    Menampilkan tombol ringan untuk menyiapkan laporan PDF. PDF baru dibangun (build_report)
+    ketika diminta, lalu tombol unduh ditampilkan untuk laporan tersebut.
+    """
+    if st.button(prepare_label, key=f"prepare_{key}"):
+        st.session_state.requested_reports.add(report_key)
+    if report_key not in st.session_state.requested_reports:
+        return
 
+    try:
+        with st.spinner("⏳ Menyiapkan laporan PDF..."):
+            pdf_data = build_report()
     except Exception as e:
         st.error(f"Terjadi kesalahan saat membuat PDF: {str(e)}")
-        return None
+        return
+    filename = f"{file_prefix}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    st.download_button(
+        label="📥 Unduh Laporan PDF",
+        data=pdf_data,
+        file_name=filename,
+        mime="application/pdf",
+        key=f"download_{key}"
+    )
 
 
 # Model untuk deteksi objek dengan webcam
@@ -112,103 +90,149 @@ class VideoTransformer(VideoProcessorBase):
     """
 
     def __init__(self):
-        self.model = YOLO(settings.DETECTION_MODEL)
+        # Model bersama level proses; tidak dimuat ulang untuk setiap sesi WebRTC
+        model_entry = model_registry.get_entry()
+        self.model = model_entry.model
+        self.model_lock = model_entry.lock
         self.confidence = 0.3
+        # Filter yang diteruskan langsung ke NMS model; dapat diubah dari UI tanpa membuat ulang pemroses
+        self.iou = settings.WEBCAM_IOU
+        self.max_det = settings.WEBCAM_MAX_DET
+        self.classes = settings.WEBCAM_CLASSES
         self.detected_objects = []
         self.resize_dim = None # Default: no resize
+        self.target_fps = settings.WEBCAM_TARGET_FPS
+        # Pengendali resolusi adaptif (adaptive.AdaptiveResolutionController) atau None untuk resize_dim tetap
+        self.adaptive = None
+        # (tracker_type, detect_every) jika mode tracking aktif, None untuk deteksi setiap frame
+        self.tracking_config = None
+        self.tracking = None
+        # True jika frame terakhir benar-benar menjalankan deteksi (bukan hanya ekstrapolasi track)
+        self.last_frame_detected = False
+        # Inferensi berjalan di thread terpisah agar recv tidak pernah menunggu model
+        self.worker = inference.AsyncInferenceWorker(self._infer, self.target_fps)
+
+    def _infer(self, img):
+        """
+        Menjalankan deteksi pada satu frame (dipanggil dari thread worker) dan
+        mengembalikan daftar (deteksi, id track) dengan koordinat pada resolusi frame asli.
+        """
+        resize_dim = self.resize_dim
+        # imgsz selalu diteruskan agar ukuran adaptif tidak tertinggal di model bersama
+        imgsz = settings.EXPORT_IMGSZ
+        adaptive_controller = self.adaptive
+        # Worker memproses frame berurutan, jadi latest_latency di sini milik frame sebelumnya
+        previous_detected, self.last_frame_detected = self.last_frame_detected, False
+        if adaptive_controller is not None:
+            # Latensi frame sebelumnya menentukan resolusi frame ini; ukuran selaras stride
+            # diteruskan sebagai imgsz sehingga model tidak melakukan letterbox resize kedua.
+            # Frame tracking tanpa deteksi jauh lebih cepat sehingga tidak dihitung.
+            if previous_detected and self.worker.latest_latency is not None:
+                adaptive_controller.observe(self.worker.latest_latency)
+            height, width = img.shape[:2]
+            resize_dim = adaptive_controller.resize_dim(width, height)
+            if model_export.supports_dynamic_input():
+                imgsz = (resize_dim[1], resize_dim[0])
+
+        tracking_config = self.tracking_config
+        track_ids = None
+        if tracking_config is None:
+            self.tracking = None
+            detections = inference.detect_frame(
+                self.model, img, self.confidence, iou=self.iou, max_det=self.max_det,
+                classes=self.classes, resize_dim=resize_dim, lock=self.model_lock, imgsz=imgsz)
+            self.last_frame_detected = True
+        else:
+            # Sesi tracking dibuat ulang hanya jika jenis tracker atau interval deteksi berubah
+            if self.tracking is None or \
+                    (self.tracking.tracker_type, self.tracking.detect_every) != tracking_config:
+                tracker_type, detect_every = tracking_config
+                self.tracking = tracking.TrackingSession(
+                    self.model, self.model_lock, tracker_type, detect_every,
+                    frame_rate=self.target_fps)
+            detection_steps = self.tracking.detection_steps
+            detections, track_ids = self.tracking.update(
+                img, self.confidence, iou=self.iou, max_det=self.max_det,
+                classes=self.classes, resize_dim=resize_dim, imgsz=imgsz)
+            self.last_frame_detected = self.tracking.detection_steps > detection_steps
+
+        names = self.model.names
+        detected_objects = []
+        for b, conf, c in zip(detections.xyxy, detections.conf.tolist(), detections.cls.tolist()):
+            detected_objects.append({
+                'label': names[c],
+                'confidence': conf,
+                'box': b,
+            })
+
+        self.detected_objects = detected_objects
+        return [(detections, track_ids)]
 
     def recv(self, frame: av.VideoFrame) -> av.VideoFrame:
         """
-        Menerima frame video, melakukan deteksi, dan mengembalikan frame dengan kotak pembatas.
+        Menerima frame video, menyerahkannya ke worker inferensi, dan langsung mengembalikan
+        frame dengan kotak pembatas dari hasil deteksi terbaru.
         """
-        img = frame.to_ndarray(format="bgr24")
-        self.detected_objects = []
+        with metrics.span('webcam_frame_decode'):
+            img = frame.to_ndarray(format="bgr24")
 
-        # Resize frame jika resize_dim diatur
-        if self.resize_dim:
-            img_resized = cv2.resize(img, self.resize_dim)
-        else:
-            img_resized = img
-
-        results = self.model(img_resized, stream=True)
-
-        for r in results:
-            boxes = r.boxes
-            for box in boxes:
-                b = box.xyxy[0].cpu().numpy()
-                c = box.cls
-                conf = box.conf.item()
-                if conf >= self.confidence:
-                    x1, y1, x2, y2 = map(int, b)
-                    # Mengubah format confidence menjadi persentase
-                    label = f"{self.model.names[int(c)]} {conf:.0%}" # Mengubah format ke persen
-
-                    # Jika frame di-resize sebelum deteksi, koordinat bounding box perlu diskalakan kembali
-                    if self.resize_dim:
-                        original_h, original_w, _ = img.shape
-                        resized_w, resized_h = self.resize_dim
-                        scale_x = original_w / resized_w
-                        scale_y = original_h / resized_h
-                        x1 = int(x1 * scale_x)
-                        y1 = int(y1 * scale_y)
-                        x2 = int(x2 * scale_x)
-                        y2 = int(y2 * scale_y)
-
-
-                    # Define font properties for the label
-                    font = cv2.FONT_HERSHEY_SIMPLEX
-                    font_scale = 1.8  # Ukuran font 2x lebih besar dari 0.9
-                    font_thickness = 2
-                    text_color = (255, 255, 255)  # Putih
-                    bg_color = (0, 0, 0)  # Hitam
-
-                    # Get text size to calculate background rectangle dimensions
-                    (text_width, text_height), baseline = cv2.getTextSize(
-                        label, font, font_scale, font_thickness)
-
-                    # Calculate the top-left corner of the text's baseline (original position)
-                    text_baseline_y = y1 - 10
-                    # Calculate the actual top of the text based on its height
-                    text_top_y = text_baseline_y - text_height
-
-                    # Add some padding around the text for the background rectangle
-                    padding_x = 10
-                    padding_y = 5
-
-                    # Coordinates for the black background rectangle
-                    # Start from x1, and slightly above the text top
-                    bg_rect_x1 = x1
-                    bg_rect_y1 = text_top_y - padding_y
-                    bg_rect_x2 = x1 + text_width + padding_x * 2
-                    bg_rect_y2 = text_baseline_y + baseline + padding_y  # Extend slightly below baseline
-
-                    # Ensure coordinates are within image bounds to prevent drawing outside
-                    bg_rect_x1 = max(0, bg_rect_x1)
-                    bg_rect_y1 = max(0, bg_rect_y1)
-                    bg_rect_x2 = min(img.shape[1], bg_rect_x2)
-                    bg_rect_y2 = min(img.shape[0], bg_rect_y2)
-
-                    # Draw the filled black background rectangle
-                    cv2.rectangle(
-                        img, (bg_rect_x1, bg_rect_y1), (bg_rect_x2, bg_rect_y2), bg_color, -1)
-
-                    # Draw the bounding box (green color, as it was)
-                    cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 2)
-
-                    # Draw the text (white color) on top of the black background
-                    # The text's x position should be adjusted for padding within the background rectangle
-                    # The text's baseline y position remains the same as calculated before
-                    cv2.putText(img, label, (x1 + padding_x, text_baseline_y),
-                                font, font_scale, text_color, font_thickness, cv2.LINE_AA)
-
-                    self.detected_objects.append({
-                        'label': self.model.names[int(c)],
-                        'confidence': conf,
-                        'box': b
-                    })
+        # Dalam mode adaptif laju inferensi diatur oleh pengendali
+        adaptive_controller = self.adaptive
+        self.worker.target_fps = adaptive_controller.target_fps if adaptive_controller else self.target_fps
+        self.worker.submit(img)
+
+        # Label dirender dari cache sprite, sama dengan gambar hasil deteksi unggahan
+        with metrics.span('webcam_draw'):
+            for detections, track_ids in self.worker.latest_result or []:
+                overlay.draw_detections(img, detections, self.model.names, track_ids=track_ids)
 
         return av.VideoFrame.from_ndarray(img, format="bgr24")
 
+    def on_ended(self):
+        """
+        Menghentikan worker inferensi ketika stream WebRTC berakhir.
+        """
+        self.worker.stop()
+
+
+def display_tracking_options():
+    """
+    Menampilkan pilihan tracking di sidebar. Mengembalikan (tracker_type, detect_every)
+    jika tracking aktif, atau None.
+    """
+    with st.sidebar:
+        is_display_tracker, tracker_type = helper.display_tracker_options()
+        if not is_display_tracker:
+            return None
+        detect_every = st.slider(
+            "Deteksi Penuh Setiap N Frame", 1, 10, settings.TRACK_DETECT_EVERY,
+            help="Di antara frame deteksi, kotak diteruskan oleh tracker tanpa menjalankan model.")
+    return tracker_type, detect_every
+
+
+def show_diagnostics_panel():
+    """
+    Menampilkan durasi per tahap (p50/p95/p99) dan counter dari modul metrics di sidebar.
+    """
+    counters, spans = metrics.snapshot()
+    with st.sidebar.expander("🩺 Diagnostik Performa"):
+        def ms(seconds):
+            return f"{seconds * 1000:.1f}" if seconds is not None else "-"
+
+        if spans:
+            st.table([{
+                "Tahap": span['name'], "Jumlah": span['count'], "p50 (ms)": ms(span['p50']),
+                "p95 (ms)": ms(span['p95']), "p99 (ms)": ms(span['p99']),
+                "Total (s)": f"{span['sum']:.2f}",
+            } for span in spans])
+        if counters:
+            st.table([{"Counter": name, "Nilai": value} for name, value in sorted(counters.items())])
+        st.download_button(
+            "⬇️ Ekspor Prometheus", metrics.to_prometheus(), file_name="metrics.prom",
+            mime="text/plain")
+        if st.button("🔄 Reset Metrik"):
+            metrics.REGISTRY.reset()
+
 
 # Fungsi untuk halaman deteksi (sebelumnya main_app)
 def detection_page():
@@ -227,75 +251,34 @@ def detection_page():
     def get_disease_explanation(disease_label):
         """
         Mendapatkan penjelasan detail tentang penyakit dari model Gemini.
+        Penjelasan disimpan di explanations.ExplanationStore sehingga setiap label hanya diminta sekali.
         """
         if not GEMINI_CONFIGURATED:
             return "API Gemini belum terkonfigurasi dengan benar. Silakan periksa konfigurasi API key Anda."
 
         try:
-            prompt = f"""
-            Berikan penjelasan detail tentang penyakit daun padi "{disease_label}" dengan format berikut:
-            
-            PENJELASAN:
-            [Jelaskan gejala dan penyebab penyakit pada daun padi tersebut secara detail]
-            
-            DAMPAK:
-            [Jelaskan dampak penyakit ini terhadap tanaman daun padi]
-            
-            REKOMENDASI PENANGANAN:
-            [Berikan 2-4 rekomendasi penanganan yang bisa dilakukan petani]
-            """
-
-            model = genai.GenerativeModel("gemini-2.0-flash")
-            response = model.generate_content(prompt)
-            return response.text
+            return explanations.get_store().get(disease_label)
         except Exception as e:
             return f"Terjadi kesalahan saat mendapatkan penjelasan dari Gemini: {str(e)}"
 
     # Inisialisasi state sesi jika belum ada
-    if 'detection_boxes' not in st.session_state:
-        st.session_state.detection_boxes = None
+    if 'detection_results' not in st.session_state:
+        st.session_state.detection_results = None
     if 'detection_model' not in st.session_state:
         st.session_state.detection_model = None
     if 'detection_confidence' not in st.session_state:
         st.session_state.detection_confidence = None
-
-    def save_detection(image):
-        """
-        Menyimpan gambar hasil deteksi ke database SQLite.
-        """
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        img_byte_arr = io.BytesIO()
-        image.save(img_byte_arr, format='PNG')
-        img_byte_arr = img_byte_arr.getvalue()
-        conn.execute(
-            "INSERT INTO detections (timestamp, image) VALUES (?, ?)", (timestamp, img_byte_arr))
-        conn.commit()
-
-    def load_detection_history():
-        """
-        Memuat riwayat deteksi dari database SQLite.
-        """
-        c = conn.cursor()
-        c.execute(
-            "SELECT id, timestamp, image FROM detections ORDER BY timestamp DESC")
-        return c.fetchall()
-
-    def delete_all_detections():
-        """
-        Menghapus semua riwayat deteksi dari database SQLite.
-        """
-        c = conn.cursor()
-        c.execute("DELETE FROM detections")
-        conn.commit()
-
-    # Inisialisasi database SQLite
-    conn = sqlite3.connect(
-        'detection_paddy_leaves.db', check_same_thread=False)
-    conn.execute('''CREATE TABLE IF NOT EXISTS detections
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
-                  timestamp TEXT,
-                  image BLOB)''')
-    conn.commit()
+    if 'detection_upload_digests' not in st.session_state:
+        st.session_state.detection_upload_digests = None
+    if 'requested_reports' not in st.session_state:
+        st.session_state.requested_reports = set()
+    # Kunci cache hasil yang sudah disimpan ke riwayat di sesi ini, agar menekan tombol deteksi
+    # lagi untuk unggahan yang sama tidak menambah baris ganda
+    if 'saved_detection_keys' not in st.session_state:
+        st.session_state.saved_detection_keys = set()
+
+    # Riwayat deteksi disimpan lewat storage bersama (pool koneksi + antrean tulis)
+    storage_db = storage.get_storage()
 
     st.title("Deteksi Penyakit Tanaman Daun Padi")
     st.markdown("---")
@@ -307,117 +290,258 @@ def detection_page():
     confidence = float(st.sidebar.slider(
         "Pilih Tingkat Kepercayaan Model (%)", 25, 100, 30)) / 100
 
-    # Asumsi settings.DETECTION_MODEL mengarah ke path model YOLO
-    model_path = os.path.join(os.getcwd(), 'weights', 'best.pt')
-    model = YOLO(model_path)
+    # Model dimuat sekali per proses dan dipakai bersama oleh semua rerun dan sesi
+    model_entry = model_registry.get_entry()
+    model = model_entry.model
+    # Isi store penjelasan untuk semua kelas model di latar belakang
+    if GEMINI_CONFIGURATED:
+        explanations.get_store().prefill(model.names.values())
+    st.sidebar.caption(
+        f"Model dimuat dalam {model_entry.load_seconds * 1000:.0f} ms, "
+        f"memori proses {model_entry.rss_mb:.0f} MB")
 
     st.sidebar.header("Konfigurasi Gambar/Video")
     source_radio = st.sidebar.radio(
-        "Pilih Sumber", ["Unggah Gambar", "Kamera"])  # Menggunakan string langsung untuk kemudahan
+        "Pilih Sumber", ["Unggah Gambar", "Kamera", settings.VIDEO, settings.RTSP, settings.YOUTUBE])
 
-    source_img = None
+    source_imgs = []
+    upload_digests = []
 
     # Deteksi Gambar
     if source_radio == "Unggah Gambar":
-        source_img = st.sidebar.file_uploader(
-            "", type=("jpg", "jpeg", "png", 'bmp', 'webp'))  # Label diatur menjadi string kosong
+        source_imgs = st.sidebar.file_uploader(
+            "", type=("jpg", "jpeg", "png", 'bmp', 'webp'),
+            accept_multiple_files=True)  # Label diatur menjadi string kosong
+
+        use_tiling = st.sidebar.checkbox(
+            "Mode Tiling (Gambar Resolusi Tinggi)",
+            help="Gambar besar dipotong menjadi tile yang saling tumpang tindih agar lesi kecil "
+                 "tetap terdeteksi. Gambar kecil tidak dipotong.")
+        tile_size, tile_overlap = settings.TILE_SIZE, settings.TILE_OVERLAP
+        if use_tiling:
+            tile_size = st.sidebar.select_slider(
+                "Ukuran Tile (piksel)", [320, 480, 640, 800, 960, 1280], settings.TILE_SIZE)
+            tile_overlap = st.sidebar.slider(
+                "Tumpang Tindih Tile", 0.0, 0.5, settings.TILE_OVERLAP, 0.05)
 
         detect_button = st.sidebar.button('🔍 Deteksi Objek')
 
         # Layout berdampingan untuk gambar asli dan hasil deteksi
         col1, col2 = st.columns(2, gap="medium") # Mengubah gap antar kolom menjadi "medium"
-
         with col1:
             st.subheader("📷 Gambar Asli")
-            try:
-                if source_img is None:
-                    # Asumsi settings.DEFAULT_IMAGE adalah path ke gambar default
-                    default_image_path = str(settings.DEFAULT_IMAGE)
-                    default_image = Image.open(default_image_path)
-                    st.image(default_image_path, caption="Gambar Default",
-                            use_column_width=True)
-                else:
-                    uploaded_image = Image.open(source_img)
-                    st.image(source_img, caption="Gambar yang Diunggah",
-                            use_column_width=True)
-            except Exception as ex:
-                st.error(
-                    "Terjadi kesalahan saat membuka gambar. Pastikan file adalah gambar yang valid.")
-                st.error(ex)
-
         with col2:
             st.subheader("🎯 Hasil Deteksi")
-            if source_img is None:
+
+        if not source_imgs:
+            with col1:
+                # Asumsi settings.DEFAULT_IMAGE adalah path ke gambar default
+                default_image_path = str(settings.DEFAULT_IMAGE)
+                st.image(default_image_path, caption="Gambar Default",
+                        use_column_width=True)
+            with col2:
                 # Asumsi settings.DEFAULT_DETECT_IMAGE adalah path ke gambar deteksi default
                 default_detected_image_path = str(
                     settings.DEFAULT_DETECT_IMAGE)
-                default_detected_image = Image.open(
-                    default_detected_image_path)
                 st.image(default_detected_image_path,
                         caption='Gambar Terdeteksi Default',
                         use_column_width=True)
-            else:
-                if detect_button:
-                    with st.spinner("⏳ Melakukan deteksi objek..."):
-                        res = model.predict(uploaded_image,
-                                            conf=confidence
-                                            )
-                        boxes = res[0].boxes
-                        res_plotted = res[0].plot()[:, :, ::-1]
-                        detected_image = Image.fromarray(res_plotted)
-                        st.image(res_plotted, caption='Gambar Terdeteksi',
-                                use_column_width=True)
-                        save_detection(detected_image)  # Simpan hasil deteksi
-
-                        st.session_state.detection_boxes = boxes
-                        st.session_state.detection_model = model
-                        st.session_state.detection_confidence = confidence
-
-        # Tampilkan analisis deteksi jika ada hasil dan tombol deteksi ditekan
-        if source_img is not None and detect_button and 'detection_boxes' in st.session_state:
+        else:
+            # Decode semua gambar secara paralel, lalu tampilkan satu baris grid per gambar
+            uploaded_images = []
+            result_slots = []
+            # Tanpa tiling gambar cukup di-decode sampai ukuran yang dibutuhkan model;
+            # tiling membutuhkan resolusi penuh
+            ingest_max_side = None if use_tiling else settings.INGEST_MAX_SIDE
+            for decoded in inference.decode_images(source_imgs, max_side=ingest_max_side):
+                if decoded.error is not None:
+                    st.error(
+                        f"Terjadi kesalahan saat membuka gambar {decoded.name}. Pastikan file adalah gambar yang valid.")
+                    st.error(decoded.error)
+                    continue
+                row_col1, row_col2 = st.columns(2, gap="medium")
+                with row_col1:
+                    st.image(decoded.image, caption=f"Gambar yang Diunggah: {decoded.name}",
+                            use_column_width=True)
+                uploaded_images.append(decoded)
+                result_slots.append(row_col2.empty())
+            upload_digests = [decoded.digest for decoded in uploaded_images]
+
+            if detect_button and uploaded_images:
+                detection_results = {}
+
+                def show_detection_result(index, detections, detection_id):
+                    """
+                    Menggambar, menampilkan dan menyimpan hasil deteksi untuk satu gambar.
+                    Hasil dari cache tetap disimpan ke riwayat, kecuali sudah disimpan di sesi ini.
+                    """
+                    decoded = uploaded_images[index]
+                    # Gambar hasil memakai renderer yang sama dengan webcam
+                    with metrics.span('draw_detections'):
+                        detected_bgr = overlay.draw_detections(
+                            decoded.image[:, :, ::-1].copy(), detections, model.names)
+                    res_plotted = detected_bgr[:, :, ::-1]
+                    detected_image = Image.fromarray(res_plotted)
+                    result_slots[index].image(
+                        res_plotted, caption=f'Gambar Terdeteksi: {decoded.name}',
+                        use_column_width=True)
+                    # Simpan gambar beserta kotak, versi model dan threshold (diantrekan)
+                    if detection_id not in st.session_state.saved_detection_keys:
+                        storage_db.save_detection(
+                            detected_image, detections, model.names, model_entry.version,
+                            confidence, decoded.name, original_image=decoded.image)
+                        st.session_state.saved_detection_keys.add(detection_id)
+
+                    detection_results[index] = {
+                        'id': detection_id,
+                        'name': decoded.name,
+                        'detections': detections,
+                        'detected_image': detected_image,
+                    }
+
+                with st.spinner(f"⏳ Melakukan deteksi objek pada {len(uploaded_images)} gambar..."):
+                    # Gambar yang sama (hash isi, versi model, parameter inferensi) tidak diinferensi ulang
+                    cache = result_cache.get_cache()
+                    args = inference.predict_args(confidence)
+                    pending = []
+                    # Hasil tiling berbeda dengan inferensi biasa, jadi parameternya ikut di kunci cache
+                    # Koordinat kotak bergantung pada resolusi decode, jadi batasnya ikut di kunci cache
+                    result_version = f"{model_entry.version}|max{ingest_max_side}"
+                    if use_tiling:
+                        result_version += f"|tile{tile_size}x{tile_overlap:.2f}"
+                    for index, decoded in enumerate(uploaded_images):
+                        cache_key = cache.make_key(decoded.digest, result_version, args)
+                        detections = cache.get(cache_key)
+                        if detections is not None:
+                            show_detection_result(index, detections, cache_key)
+                        else:
+                            pending.append((index, cache_key))
+
+                    if use_tiling:
+                        # Tile setiap gambar sudah diinferensi dalam batch oleh predict_tiled
+                        for index, cache_key in pending:
+                            detections = tiling.predict_tiled(
+                                model, uploaded_images[index].image, confidence, tile_size,
+                                tile_overlap, lock=model_entry.lock)
+                            cache.put(cache_key, detections)
+                            show_detection_result(index, detections, cache_key)
+                        pending = []
+
+                    images = [uploaded_images[index].image for index, _ in pending]
+                    # Hasil setiap batch langsung ditampilkan tanpa menunggu batch berikutnya
+                    for start, results in inference.predict_batches(
+                            model, images, confidence, lock=model_entry.lock):
+                        for offset, res in enumerate(results):
+                            index, cache_key = pending[start + offset]
+                            detections = inference.boxes_to_arrays(res)
+                            cache.put(cache_key, detections)
+                            show_detection_result(index, detections, cache_key)
+
+                st.session_state.detection_results = [
+                    detection_results[index] for index in sorted(detection_results)]
+                st.session_state.detection_upload_digests = upload_digests
+                st.session_state.detection_model = model
+                st.session_state.detection_confidence = confidence
+            elif st.session_state.detection_results and \
+                    st.session_state.detection_upload_digests == upload_digests:
+                # Rerun tanpa menekan tombol deteksi (misalnya tombol laporan): tampilkan ulang hasil tersimpan
+                for index, result in enumerate(st.session_state.detection_results):
+                    result_slots[index].image(
+                        result['detected_image'], caption=f"Gambar Terdeteksi: {result['name']}",
+                        use_column_width=True)
+
+        # Tampilkan analisis deteksi selama hasil tersimpan masih milik gambar yang sedang diunggah
+        if source_imgs and st.session_state.detection_results and \
+                st.session_state.detection_upload_digests == upload_digests:
             st.markdown("---")
             st.header("📊 Hasil Analisis Deteksi")
 
-            boxes = st.session_state.detection_boxes
             model = st.session_state.detection_model
             confidence = st.session_state.detection_confidence
 
-            if len(boxes) == 0:
-                st.info(
-                    "Tidak ada penyakit daun padi yang terdeteksi pada gambar ini dengan tingkat kepercayaan yang dipilih.")
-            else:
-                for box in boxes:
-                    label = model.names[int(box.cls)]
-                    conf = box.conf.item()
+            # Kerangka hasil dibuat lebih dulu dengan urutan tetap; isinya diisi begitu tugasnya selesai
+            box_slots = []
+            consolidated_slots = []
+            for image_index, result in enumerate(st.session_state.detection_results):
+                detections = result['detections']
+                if len(st.session_state.detection_results) > 1:
+                    st.subheader(f"🖼️ {result['name']}")
+
+                if len(detections.cls) == 0:
+                    st.info(
+                        "Tidak ada penyakit daun padi yang terdeteksi pada gambar ini dengan tingkat kepercayaan yang dipilih.")
+                    continue
+
+                # Laporan gabungan (satu file untuk semua kotak) diisi setelah semua penjelasan siap
+                if GEMINI_CONFIGURATED and len(detections.cls) > 1:
+                    consolidated_slots.append((image_index, st.empty()))
+
+                for box_index, (c, conf) in enumerate(zip(detections.cls.tolist(), detections.conf.tolist())):
+                    label = model.names[c]
                     with st.container():
                         st.subheader(
                             f"Deteksi: {label} (Kepercayaan: {conf:.0%})") # Mengubah format ke persen
 
                         if GEMINI_CONFIGURATED:
-                            with st.spinner(f"🔄 Mendapatkan penjelasan untuk '{label}'..."):
-                                explanation = get_disease_explanation(
-                                    label)
-                                st.markdown(explanation)
-
-                                col1, col2 = st.columns([1, 6])
-                                with col1:
-                                    pdf_data = create_detection_pdf(
-                                        detected_image, label, conf, explanation)
-                                    if pdf_data:
-                                        filename = f"deteksi_{label.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-                                        st.download_button(
-                                            label="📥 Unduh Laporan PDF",
-                                            data=pdf_data,
-                                            file_name=filename,
-                                            mime="application/pdf",
-                                            key=f"download_{label}_{conf}"
-                                        )
+                            placeholder = st.empty()
+                            placeholder.info(f"🔄 Mendapatkan penjelasan untuk '{label}'...")
+                            box_slots.append({
+                                'key': f"{image_index}_{box_index}",
+                                'label': label,
+                                'confidence': conf,
+                                'image_index': image_index,
+                                'placeholder': placeholder,
+                            })
                         else:
                             st.warning(
                                 "⚠️ API Gemini tidak terkonfigurasi. Penjelasan penyakit tidak dapat ditampilkan.")
 
                         st.markdown("---")
 
+            if box_slots:
+                # Penjelasan diambil paralel (satu permintaan per label unik), sehingga waktu tunggu
+                # mendekati label paling lambat, bukan jumlah semuanya
+                pending = {}
+                for label in dict.fromkeys(slot['label'] for slot in box_slots):
+                    future = explanations.get_executor().submit(get_disease_explanation, label)
+                    pending[future] = label
+
+                explanation_by_label = {}
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        label = pending.pop(future)
+                        explanation = future.result()
+                        explanation_by_label[label] = explanation
+                        for slot in box_slots:
+                            if slot['label'] != label:
+                                continue
+                            result = st.session_state.detection_results[slot['image_index']]
+                            with slot['placeholder'].container():
+                                st.markdown(explanation)
+                                col1, col2 = st.columns([1, 6])
+                                with col1:
+                                    show_report_download(
+                                        (result['id'], slot['label'], slot['confidence']),
+                                        lambda: build_detection_report(
+                                            result['id'], slot['label'], slot['confidence'],
+                                            explanation, result['detected_image']),
+                                        f"deteksi_{slot['label'].replace(' ', '_')}",
+                                        f"{slot['key']}_{slot['label']}")
+
+                for image_index, placeholder in consolidated_slots:
+                    result = st.session_state.detection_results[image_index]
+                    labels = dict.fromkeys(model.names[c] for c in result['detections'].cls.tolist())
+                    explanation_items = tuple((label, explanation_by_label[label]) for label in labels)
+                    with placeholder.container():
+                        show_report_download(
+                            (result['id'], 'gabungan'),
+                            lambda: build_consolidated_report(
+                                result['id'], explanation_items, result, model.names),
+                            "laporan_gabungan",
+                            f"consolidated_{image_index}",
+                            prepare_label="📑 Siapkan Laporan Gabungan")
+
     # Deteksi Webcam
     elif source_radio == "Kamera":
         st.header("📹 Deteksi Penyakit via Webcam")
@@ -429,13 +553,35 @@ def detection_page():
         st.sidebar.subheader("Optimasi Webcam")
         resize_option = st.sidebar.selectbox(
             "Resolusi Proses Webcam",
-            ["Original", "640x480", "480x360", "320x240"],
+            ["Original", "640x480", "480x360", "320x240", "Adaptif"],
             index=1, # Default ke 640x480
-            help="Mengubah ukuran frame sebelum deteksi. Resolusi lebih rendah = performa lebih baik."
+            help="Mengubah ukuran frame sebelum deteksi. Resolusi lebih rendah = performa lebih baik. "
+                 "Adaptif menyesuaikan resolusi dan laju inferensi dengan latensi perangkat."
         )
+        target_latency_ms = None
+        if resize_option == "Adaptif":
+            target_latency_ms = st.sidebar.slider(
+                "Target Latensi (ms)", 50, 1000, settings.ADAPTIVE_TARGET_LATENCY_MS, 10,
+                help="Latensi sejak frame diterima sampai hasil deteksinya siap.")
+
+        target_fps = st.sidebar.slider(
+            "Target FPS Inferensi", 1, 30, settings.WEBCAM_TARGET_FPS,
+            help="Jumlah frame per detik yang dideteksi. Frame lain tetap ditampilkan dengan hasil deteksi terakhir.")
+
+        iou = st.sidebar.slider(
+            "Ambang IoU NMS", 0.1, 0.95, settings.WEBCAM_IOU, 0.05,
+            help="Kotak yang tumpang tindih melebihi nilai ini digabung menjadi satu deteksi.")
+        max_det = st.sidebar.number_input(
+            "Maksimum Deteksi per Frame", 1, 300, settings.WEBCAM_MAX_DET)
+        class_names = list(model.names.values())
+        selected_classes = st.sidebar.multiselect(
+            "Filter Penyakit", class_names,
+            help="Kosongkan untuk mendeteksi semua jenis penyakit.")
+        classes = [i for i, name in model.names.items() if name in selected_classes] or None
+        tracking_config = display_tracking_options()
 
         resize_dim_tuple = None
-        if resize_option != "Original":
+        if resize_option not in ("Original", "Adaptif"):
             width, height = map(int, resize_option.split('x'))
             resize_dim_tuple = (width, height)
 
@@ -449,36 +595,152 @@ def detection_page():
             async_processing=True,
         )
 
-        # Atur tingkat kepercayaan dan resolusi untuk pemroses video jika sudah aktif
+        # Atur tingkat kepercayaan, filter NMS dan resolusi untuk pemroses video jika sudah aktif
         if webrtc_ctx.video_processor:
             webrtc_ctx.video_processor.confidence = confidence
             webrtc_ctx.video_processor.resize_dim = resize_dim_tuple
+            webrtc_ctx.video_processor.target_fps = target_fps
+            webrtc_ctx.video_processor.iou = iou
+            webrtc_ctx.video_processor.max_det = int(max_det)
+            webrtc_ctx.video_processor.classes = classes
+            webrtc_ctx.video_processor.tracking_config = tracking_config
+            processor = webrtc_ctx.video_processor
+            if target_latency_ms is None:
+                processor.adaptive = None
+            elif processor.adaptive is None:
+                processor.adaptive = adaptive.AdaptiveResolutionController(
+                    target_latency_ms, max_fps=target_fps)
+            else:
+                # Pengendali yang sudah berjalan dipertahankan agar level yang dipelajari tidak hilang
+                processor.adaptive.target_seconds = target_latency_ms / 1000
+                processor.adaptive.max_fps = target_fps
+                processor.adaptive.target_fps = min(processor.adaptive.target_fps, target_fps)
+            if processor.adaptive is not None:
+                st.sidebar.caption(f"Adaptif: {processor.adaptive.describe()}")
+
+    elif source_radio in (settings.VIDEO, settings.RTSP, settings.YOUTUBE):
+        st.header(f"🎞️ Deteksi Penyakit dari {source_radio}")
+        if source_radio == settings.VIDEO:
+            video_name = st.sidebar.selectbox("Pilih Video", list(settings.VIDEOS_DICT))
+            make_source = lambda **kwargs: frame_sources.VideoFileSource(
+                settings.VIDEOS_DICT[video_name], **kwargs)
+        elif source_radio == settings.RTSP:
+            rtsp_url = st.sidebar.text_input("URL Stream RTSP", settings.DEFAULT_RTSP_URL)
+            make_source = lambda **kwargs: frame_sources.RTSPSource(rtsp_url, **kwargs)
+        else:
+            youtube_url = st.sidebar.text_input("URL Video YouTube")
+            make_source = lambda **kwargs: frame_sources.YouTubeSource(youtube_url, **kwargs)
+
+        stream_fps = st.sidebar.slider(
+            "Target FPS Inferensi", 1, 30, settings.STREAM_TARGET_FPS,
+            help="Frame di antaranya dilewati tanpa di-decode.")
+        tracking_config = display_tracking_options()
+
+        if st.sidebar.button("▶️ Mulai Deteksi Stream"):
+            # Hanya satu stream aktif per sesi; stream lama dihentikan sebelum yang baru dimulai
+            previous_source = st.session_state.get('stream_source')
+            if previous_source is not None:
+                previous_source.stop()
+            source = make_source(target_fps=stream_fps).start()
+            st.session_state.stream_source = source
+            session = None
+            if tracking_config is not None:
+                tracker_type, detect_every = tracking_config
+                session = tracking.TrackingSession(
+                    model, model_entry.lock, tracker_type, detect_every, frame_rate=stream_fps)
+            st_frame = st.empty()
+            st_status = st.empty()
+            try:
+                for index, frame in source.frames():
+                    track_ids = None
+                    if session is None:
+                        detections = inference.detect_frame(
+                            model, frame, confidence, lock=model_entry.lock)
+                    else:
+                        detections, track_ids = session.update(frame, confidence)
+                    overlay.draw_detections(frame, detections, model.names, track_ids=track_ids)
+                    st_frame.image(frame, channels="BGR", caption=f"Frame {index}",
+                                   use_column_width=True)
+                    status = (f"Frame di-decode: {source.decoded_frames}, dilewati: {source.skipped_frames}, "
+                              f"dibuang: {source.buffer.dropped}, sambung ulang: {source.reconnects}")
+                    if session is not None:
+                        counts = ", ".join(
+                            f"{label}: {count}" for label, count in session.track_counts(model.names).items())
+                        status += f" | Jumlah lesi unik: {counts or '-'}"
+                    st_status.caption(status)
+            finally:
+                # Rerun Streamlit (misalnya tombol lain ditekan) juga menghentikan thread decode
+                source.stop()
+            if source.error is not None:
+                st.error(f"❌ Gagal membaca {source_radio}: {str(source.error)}")
+            else:
+                st.info("ℹ️ Stream selesai.")
 
 
     # Riwayat Deteksi
     if st.sidebar.button('📚 Lihat Riwayat Deteksi'):
+        st.session_state.show_history = True
+        st.session_state.history_cursors = [None]
+        st.session_state.history_open_images = set()
+
+    if st.session_state.get('show_history'):
         with history_placeholder.container():
             st.header("📚 Riwayat Deteksi")
             if st.button("❌ Tutup Riwayat"):
+                st.session_state.show_history = False
                 history_placeholder.empty()
+                st.rerun()
+
+            with st.expander("📊 Statistik Deteksi 7 Hari Terakhir"):
+                stats = storage_db.label_counts(since=datetime.now() - timedelta(days=7))
+                if stats:
+                    st.table([
+                        {"Penyakit": label, "Jumlah Kotak": boxes, "Jumlah Gambar": images,
+                         "Rata-rata Confidence": f"{avg_conf:.0%}"}
+                        for label, boxes, images, avg_conf in stats])
+                else:
+                    st.info("ℹ️ Belum ada deteksi dalam 7 hari terakhir.")
 
-            history = load_detection_history()
+            # history_cursors menyimpan cursor awal setiap halaman yang sudah dikunjungi
+            cursors = st.session_state.history_cursors
+            history = storage_db.load_detection_history(cursors[-1])
 
             if not history or len(history) == 0:
                 st.info("ℹ️ Belum ada riwayat deteksi yang tersimpan.")
             else:
-                st.success(f"✅ Ditemukan {len(history)} hasil deteksi.")
-                for id, timestamp, image in history:
+                page = len(cursors)
+                st.success(f"✅ Ditemukan {storage_db.count_detections()} hasil deteksi (halaman {page}).")
+                for id, timestamp, thumbnail in history:
                     try:
-                        image = Image.open(io.BytesIO(image))
                         with st.expander(f"🆔 ID: {id}, ⏰ Waktu: {timestamp}"):
-                            st.image(image, caption="Gambar Terdeteksi",
-                                    use_column_width=False, width=500)
+                            if thumbnail is not None:
+                                st.image(thumbnail, caption="Thumbnail Gambar Terdeteksi")
+                            # Gambar penuh hanya dimuat jika diminta
+                            if id in st.session_state.history_open_images or \
+                                    st.button("🔍 Tampilkan Gambar Penuh", key=f"history_full_{id}"):
+                                st.session_state.history_open_images.add(id)
+                                image = storage_db.load_detection_image(id)
+                                st.image(image, caption="Gambar Terdeteksi",
+                                        use_column_width=False, width=500)
                     except Exception as e:
                         st.error(f"❌ Error menampilkan gambar ID: {id}: {str(e)}")
 
+                nav_col1, nav_col2 = st.columns(2)
+                with nav_col1:
+                    if page > 1 and st.button("⬅️ Sebelumnya", key="history_prev"):
+                        cursors.pop()
+                        st.rerun()
+                with nav_col2:
+                    if len(history) == settings.HISTORY_PAGE_SIZE and \
+                            st.button("Berikutnya ➡️", key="history_next"):
+                        last_id, last_timestamp, _ = history[-1]
+                        cursors.append((last_timestamp, last_id))
+                        st.rerun()
+
     if st.sidebar.button('🗑️ Hapus Semua Riwayat'):
-        delete_all_detections()
+        storage_db.delete_all_detections()
+        st.session_state.show_history = False
+        st.session_state.saved_detection_keys = set()
         st.sidebar.success("✅ Semua riwayat deteksi telah dihapus.")
         history_placeholder.empty()  # Kosongkan placeholder riwayat
         with history_placeholder.container():  # Tampilkan pesan kosong setelah dihapus
@@ -1219,11 +1481,19 @@ if __name__ == "__main__":
     if 'page' not in st.session_state:
         st.session_state.page = "homepage"
 
+    # Muat dan warm-up model (backend dari settings.INFERENCE_BACKEND) saat startup,
+    # sehingga deteksi pertama tidak membayar biaya ekspor/pemuatan
+    model_registry.get_entry()
+    # Endpoint /metrics untuk Prometheus, hanya jika settings.METRICS_PORT diatur
+    if settings.METRICS_PORT is not None and metrics.start_http_server() is None:
+        st.sidebar.warning(f"⚠️ Endpoint metrik tidak aktif: {str(metrics.server_error)}")
+
     # Tampilkan halaman yang sesuai
-    if st.session_state.page == "homepage":
-        homepage()
-    elif st.session_state.page == "detection":
-        detection_page()
+    with metrics.span(f"page_{st.session_state.page}"):
+        if st.session_state.page == "homepage":
+            homepage()
+        elif st.session_state.page == "detection":
+            detection_page()
 
     # Sidebar untuk navigasi antar halaman
     st.sidebar.markdown("---")
@@ -1234,3 +1504,7 @@ if __name__ == "__main__":
     if st.sidebar.button("🔍 Halaman Deteksi"):
         st.session_state.page = "detection"
         st.experimental_rerun()
+
+    # Panel diagnostik tersembunyi, dibuka dengan menambahkan ?diagnostics=1 pada URL
+    if st.query_params.get("diagnostics") == "1":
+        show_diagnostics_panel()
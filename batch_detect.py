@@ -0,0 +1,322 @@
+import argparse
+import csv
+import json
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+import inference
+import model_registry
+import overlay
+import settings
+import tiling
+
+IMAGE_SUFFIXES = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+VIDEO_SUFFIXES = {'.mp4', '.avi', '.mov', '.mkv', '.webm'}
+
+CSV_FIELDS = ['item', 'source', 'frame', 'label', 'confidence', 'x1', 'y1', 'x2', 'y2', 'error']
+
+# Satu unit kerja: gambar utuh (frame=None, image=None, di-decode di thread pool) atau satu frame
+# video yang sudah di-decode. is_last menandai item terakhir dari source-nya untuk checkpoint.
+# name adalah path source relatif terhadap input (untuk nama file hasil); error diisi jika source
+# tidak bisa dibaca sama sekali (misalnya video rusak) agar tetap dicatat dan di-checkpoint.
+BatchItem = namedtuple('BatchItem', ['key', 'source', 'frame', 'image', 'is_last', 'name', 'error'],
+                       defaults=[None, None])
+
+
+def discover_sources(inputs):
+    """
+    Mengembalikan (path, nama_relatif) gambar dan video dari daftar file/folder (folder ditelusuri
+    rekursif), urut nama. Nama relatif dihitung dari folder input beserta nama folder itu sendiri.
+    """
+    sources = []
+    for path in map(Path, inputs):
+        if path.is_dir():
+            files = [(p, Path(path.name) / p.relative_to(path))
+                     for p in sorted(p for p in path.rglob('*') if p.is_file())]
+        else:
+            files = [(path, Path(path.name))]
+        sources.extend((p, name) for p, name in files
+                       if p.suffix.lower() in IMAGE_SUFFIXES | VIDEO_SUFFIXES)
+    return sources
+
+
+def iter_video_frames(path, stride=1, start_after=-1):
+    """
+    Men-decode frame video secara streaming dan menghasilkan (indeks_frame, array RGB) untuk
+    setiap frame ke-stride. Frame yang dilewati hanya di-grab tanpa decode.
+    """
+    capture = cv2.VideoCapture(str(path))
+    try:
+        if not capture.isOpened():
+            raise ValueError(f"Video tidak dapat dibuka: {path}")
+        index = -1
+        while capture.grab():
+            index += 1
+            if index <= start_after or index % stride:
+                continue
+            ok, frame = capture.retrieve()
+            if not ok:
+                break
+            yield index, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    finally:
+        capture.release()
+
+
+def iter_items(sources, checkpoint, video_stride=1):
+    """
+    Menghasilkan BatchItem untuk semua source yang belum selesai menurut checkpoint.
+    """
+    for path, name in sources:
+        source = str(path)
+        if source in checkpoint['completed']:
+            continue
+        if path.suffix.lower() in IMAGE_SUFFIXES:
+            yield BatchItem(source, source, None, None, True, name)
+            continue
+
+        # Baca satu frame di depan agar frame terakhir video bisa ditandai is_last
+        frames = iter_video_frames(
+            path, video_stride, checkpoint['video_frames'].get(source, -1))
+        try:
+            previous = next(frames, None)
+            if previous is None:
+                raise ValueError(f"Video tidak berisi frame yang bisa di-decode: {path}")
+        except Exception as e:
+            # Dicatat sebagai item gagal agar tidak dicoba ulang diam-diam setiap resume
+            yield BatchItem(source, source, None, None, True, name, e)
+            continue
+        for current in frames:
+            yield BatchItem(f"{source}#{previous[0]}", source, previous[0], previous[1], False, name)
+            previous = current
+        yield BatchItem(f"{source}#{previous[0]}", source, previous[0], previous[1], True, name)
+
+
+def _decode_item(item, max_side=None):
+    if item.error is not None:
+        return inference.DecodedImage(item.key, None, None, item.error)
+    if item.image is not None:
+        return inference.DecodedImage(item.key, item.image, None, None)
+    return inference.decode_images([item.source], max_side=max_side)[0]
+
+
+def iter_decoded_batches(items, batch_size, workers, max_side=None):
+    """
+    Mengelompokkan item menjadi batch dan men-decode gambar di thread pool.
+    Batch berikutnya sudah di-decode selagi batch saat ini diinferensi, dengan paling banyak dua
+    batch di memori.
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        batch = []
+        for item in items:
+            batch.append((item, executor.submit(_decode_item, item, max_side)))
+            if len(batch) == batch_size:
+                pending.append(batch)
+                batch = []
+                if len(pending) > 1:
+                    yield [(item, future.result()) for item, future in pending.popleft()]
+        if batch:
+            pending.append(batch)
+        while pending:
+            yield [(item, future.result()) for item, future in pending.popleft()]
+
+
+def load_checkpoint(path):
+    """
+    Membaca ulang log progres append-only: setiap baris {"source": ..., "frame": ...} dengan
+    frame None berarti source selesai, selain itu frame video terakhir yang sudah diproses.
+    """
+    checkpoint = {'completed': set(), 'video_frames': {}}
+    if path.exists():
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Baris terakhir bisa terpotong jika proses terhenti saat menulis
+                if entry['frame'] is None:
+                    checkpoint['completed'].add(entry['source'])
+                    checkpoint['video_frames'].pop(entry['source'], None)
+                else:
+                    checkpoint['video_frames'][entry['source']] = entry['frame']
+    return checkpoint
+
+
+def append_checkpoint(checkpoint_file, checkpoint, batch):
+    """
+    Mencatat progres satu batch di checkpoint dan menambahkannya ke log; biaya tulis sebanding
+    dengan ukuran batch, bukan dengan jumlah file yang sudah selesai.
+    """
+    progress = {}
+    for item, _ in batch:
+        if item.is_last:
+            checkpoint['completed'].add(item.source)
+            checkpoint['video_frames'].pop(item.source, None)
+            progress[item.source] = None
+        else:
+            checkpoint['video_frames'][item.source] = item.frame
+            progress[item.source] = item.frame
+    checkpoint_file.write(''.join(
+        json.dumps({'source': source, 'frame': frame}) + '\n' for source, frame in progress.items()))
+    checkpoint_file.flush()
+
+
+def annotated_path(output_dir, item):
+    """
+    Path gambar beranotasi yang mengikuti struktur folder input. Ekstensi asli ikut di nama file
+    agar img1.jpg dan img1.png di folder yang sama tidak saling menimpa.
+    """
+    name = item.name or Path(item.source)
+    stem = f"{name.stem}_{name.suffix.lstrip('.').lower()}"
+    if item.frame is not None:
+        stem = f"{stem}_f{item.frame:06d}"
+    return output_dir / 'annotated' / name.parent / f"{stem}.jpg"
+
+
+def save_annotated(path, image, detections, names):
+    bgr = overlay.draw_detections(image[:, :, ::-1].copy(), detections, names)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    cv2.imwrite(str(path), bgr)
+
+
+def run(inputs, output_dir, formats=('jsonl',), confidence=0.3, batch_size=None, workers=None,
+        video_stride=1, save_images=False, model_path=None, resume=True, tile_size=None,
+        tile_overlap=None):
+    """
+    Menjalankan deteksi pada semua gambar/video di inputs dan menulis hasil ke output_dir.
+    Checkpoint ditulis setelah setiap batch; hasil dari batch yang sedang berjalan saat proses
+    terhenti bisa muncul dua kali setelah dilanjutkan. Jika tile_size diatur, setiap gambar
+    dideteksi dengan tiling.predict_tiled.
+    """
+    batch_size = batch_size or settings.UPLOAD_BATCH_SIZE
+    workers = workers or settings.DECODE_WORKERS
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint_path = output_dir / 'progress.jsonl'
+    if not resume:
+        for name in ['progress.jsonl', 'results.jsonl', 'results.csv']:
+            (output_dir / name).unlink(missing_ok=True)
+    checkpoint = load_checkpoint(checkpoint_path)
+    completed = checkpoint['completed']
+
+    model_entry = model_registry.get_entry(model_path)
+    names = model_entry.model.names
+    sources = discover_sources(inputs)
+    print(f"{len(sources)} file ditemukan, {len(completed)} sudah selesai sebelumnya")
+
+    checkpoint_file = open(checkpoint_path, 'a')
+    jsonl_file = open(output_dir / 'results.jsonl', 'a') if 'jsonl' in formats else None
+    csv_path = output_dir / 'results.csv'
+    csv_file = csv_writer = None
+    if 'csv' in formats:
+        write_header = not csv_path.exists()
+        csv_file = open(csv_path, 'a', newline='')
+        csv_writer = csv.DictWriter(csv_file, fieldnames=CSV_FIELDS)
+        if write_header:
+            csv_writer.writeheader()
+
+    processed = 0
+    start_time = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as writer_pool:
+            # Tanpa tiling gambar cukup di-decode sampai ukuran yang dibutuhkan model
+            batches = iter_decoded_batches(
+                iter_items(sources, checkpoint, video_stride), batch_size, workers,
+                max_side=None if tile_size else settings.INGEST_MAX_SIDE)
+            for batch in batches:
+                valid = [(item, decoded) for item, decoded in batch if decoded.error is None]
+                if tile_size:
+                    detections_by_key = {
+                        item.key: tiling.predict_tiled(
+                            model_entry.model, decoded.image, confidence, tile_size, tile_overlap,
+                            batch_size, model_entry.lock)
+                        for item, decoded in valid}
+                else:
+                    results = []
+                    for _, batch_results in inference.predict_batches(
+                            model_entry.model, [decoded.image for _, decoded in valid], confidence,
+                            batch_size=len(valid) or 1, lock=model_entry.lock):
+                        results.extend(batch_results)
+                    detections_by_key = {
+                        item.key: inference.boxes_to_arrays(res) for (item, _), res in zip(valid, results)}
+
+                annotated_futures = []
+                for item, decoded in batch:
+                    detections = detections_by_key.get(item.key)
+                    boxes = [] if detections is None else [
+                        {'label': names[c], 'confidence': round(conf, 4),
+                         'xyxy': [round(v, 1) for v in xyxy]}
+                        for xyxy, conf, c in zip(detections.xyxy.tolist(), detections.conf.tolist(),
+                                                 detections.cls.tolist())]
+                    error = str(decoded.error) if decoded.error is not None else None
+                    record = {'item': item.key, 'source': item.source, 'frame': item.frame,
+                              'model_version': model_entry.version, 'confidence_threshold': confidence,
+                              'detections': boxes, 'error': error}
+                    if jsonl_file is not None:
+                        jsonl_file.write(json.dumps(record) + '\n')
+                    if csv_writer is not None:
+                        base = {'item': item.key, 'source': item.source, 'frame': item.frame, 'error': error}
+                        # Item tanpa kotak tetap dicatat satu baris agar terlihat sudah diproses
+                        for box in boxes or [{}]:
+                            x1, y1, x2, y2 = box.get('xyxy', [None] * 4)
+                            csv_writer.writerow({**base, 'label': box.get('label'),
+                                                 'confidence': box.get('confidence'),
+                                                 'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2})
+                    if save_images and detections is not None:
+                        annotated_futures.append(writer_pool.submit(
+                            save_annotated, annotated_path(output_dir, item), decoded.image,
+                            detections, names))
+
+                for future in annotated_futures:
+                    future.result()
+                for output_file in (jsonl_file, csv_file):
+                    if output_file is not None:
+                        output_file.flush()
+
+                # Checkpoint hanya maju setelah hasil batch tertulis
+                append_checkpoint(checkpoint_file, checkpoint, batch)
+
+                processed += len(batch)
+                elapsed = time.perf_counter() - start_time
+                print(f"{processed} item diproses ({processed / elapsed:.1f} item/detik)")
+    finally:
+        for output_file in (jsonl_file, csv_file, checkpoint_file):
+            if output_file is not None:
+                output_file.close()
+    return processed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deteksi penyakit daun padi secara batch tanpa Streamlit.")
+    parser.add_argument('inputs', nargs='*', default=[str(settings.IMAGES_DIR)],
+                        help="File atau folder gambar/video (folder ditelusuri rekursif)")
+    parser.add_argument('--output', default=str(settings.BATCH_OUTPUT_DIR), help="Folder hasil")
+    parser.add_argument('--format', nargs='+', default=['jsonl'], choices=['jsonl', 'csv'],
+                        help="Format file hasil")
+    parser.add_argument('--conf', type=float, default=0.3, help="Threshold confidence (0-1)")
+    parser.add_argument('--batch-size', type=int, default=settings.UPLOAD_BATCH_SIZE,
+                        help="Jumlah gambar/frame per batch inferensi")
+    parser.add_argument('--workers', type=int, default=settings.DECODE_WORKERS,
+                        help="Jumlah thread untuk decode dan menulis gambar hasil")
+    parser.add_argument('--video-stride', type=int, default=1,
+                        help="Hanya proses setiap frame ke-N dari video")
+    parser.add_argument('--save-images', action='store_true', help="Simpan gambar beranotasi")
+    parser.add_argument('--tile', type=int, default=None, metavar='SIZE',
+                        help="Aktifkan tiling dengan ukuran tile SIZE piksel untuk gambar resolusi tinggi")
+    parser.add_argument('--tile-overlap', type=float, default=settings.TILE_OVERLAP,
+                        help="Rasio tumpang tindih antar tile (0-1)")
+    parser.add_argument('--model', default=None,
+                        help="Path model; default mengikuti settings.INFERENCE_BACKEND")
+    parser.add_argument('--no-resume', action='store_true',
+                        help="Abaikan checkpoint dan hasil sebelumnya, mulai dari awal")
+    args = parser.parse_args()
+
+    run(args.inputs, args.output, formats=args.format, confidence=args.conf,
+        batch_size=args.batch_size, workers=args.workers, video_stride=args.video_stride,
+        save_images=args.save_images, model_path=args.model, resume=not args.no_resume,
+        tile_size=args.tile, tile_overlap=args.tile_overlap)
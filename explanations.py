@@ -0,0 +1,193 @@
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import metrics
+import settings
+
+# Naikkan PROMPT_VERSION setiap kali PROMPT_TEMPLATE diubah agar penjelasan lama tidak dipakai lagi
+PROMPT_VERSION = 1
+PROMPT_TEMPLATE = """
+            Berikan penjelasan detail tentang penyakit daun padi "{label}" dengan format berikut:
+
+            PENJELASAN:
+            [Jelaskan gejala dan penyebab penyakit pada daun padi tersebut secara detail]
+
+            DAMPAK:
+            [Jelaskan dampak penyakit ini terhadap tanaman daun padi]
+
+            REKOMENDASI PENANGANAN:
+            [Berikan 2-4 rekomendasi penanganan yang bisa dilakukan petani]
+            """
+
+
+class GeminiClient:
+    """
+    Klien Gemini; GenerativeModel dibuat sekali dan dipakai ulang untuk semua permintaan.
+    genai.configure(api_key=...) harus sudah dipanggil sebelumnya.
+    """
+
+    def __init__(self, model_name=None):
+        import google.generativeai as genai
+
+        self.model_name = model_name or settings.GEMINI_MODEL
+        self._model = genai.GenerativeModel(self.model_name)
+
+    def generate(self, prompt):
+        return self._model.generate_content(prompt).text
+
+
+class StubClient:
+    """
+    Klien pengganti tanpa jaringan untuk pengujian atau mode offline.
+    """
+
+    def __init__(self, text="PENJELASAN:\nPenjelasan contoh tanpa koneksi ke Gemini.", model_name='stub'):
+        self.text = text
+        self.model_name = model_name
+        self.calls = 0
+
+    def generate(self, prompt):
+        self.calls += 1
+        return self.text
+
+
+class ExplanationStore:
+    """
+    Penyimpanan penjelasan penyakit berbasis SQLite dengan TTL.
+    Kunci: (label, versi template prompt, nama model). Permintaan bersamaan untuk label yang
+    sama digabung menjadi satu panggilan ke klien.
+    """
+
+    def __init__(self, client, db_path=None, ttl_seconds=None):
+        self.client = client
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.EXPLANATION_TTL_SECONDS
+        self._conn = sqlite3.connect(
+            str(db_path if db_path is not None else settings.EXPLANATION_DB), check_same_thread=False)
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS explanations
+                     (label TEXT,
+                      prompt_version INTEGER,
+                      model_name TEXT,
+                      text TEXT,
+                      created_at REAL,
+                      PRIMARY KEY (label, prompt_version, model_name))''')
+        self._conn.commit()
+        self._db_lock = threading.Lock()
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self._prefilled = False
+
+    def _lookup(self, label):
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT text, created_at FROM explanations "
+                "WHERE label = ? AND prompt_version = ? AND model_name = ?",
+                (label, PROMPT_VERSION, self.client.model_name)).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return row[0]
+
+    def _save(self, label, text):
+        with self._db_lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO explanations "
+                "(label, prompt_version, model_name, text, created_at) VALUES (?, ?, ?, ?, ?)",
+                (label, PROMPT_VERSION, self.client.model_name, text, time.time()))
+            self._conn.commit()
+
+    def get(self, label):
+        """
+        Mengembalikan penjelasan untuk label; memanggil klien hanya jika belum ada atau kedaluwarsa.
+        Error dari klien diteruskan ke pemanggil dan tidak disimpan.
+        """
+        text = self._lookup(label)
+        if text is not None:
+            metrics.increment('explanation_store_hits')
+            return text
+
+        with self._inflight_lock:
+            future = self._inflight.get(label)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._inflight[label] = future
+        if not is_owner:
+            return future.result()
+
+        try:
+            with metrics.span('explanation_generate'):
+                text = self.client.generate(PROMPT_TEMPLATE.format(label=label))
+            self._save(label, text)
+            future.set_result(text)
+            return text
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(label, None)
+
+    def get_many(self, labels):
+        """
+        Mengembalikan {label: penjelasan atau Exception} dengan satu permintaan per label unik.
+        """
+        explanations = {}
+        for label in dict.fromkeys(labels):
+            try:
+                explanations[label] = self.get(label)
+            except Exception as e:
+                explanations[label] = e
+        return explanations
+
+    def prefill(self, labels):
+        """
+        Mengisi store untuk semua label di thread latar belakang (sekali per store).
+        """
+        if self._prefilled:
+            return
+        self._prefilled = True
+        labels = list(labels)
+        thread = threading.Thread(
+            target=self.get_many, args=(labels,), name="explanation-prefill", daemon=True)
+        thread.start()
+
+
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_store(client=None):
+    """
+    Mengembalikan ExplanationStore bersama level proses. Parameter client hanya dipakai saat
+    store pertama kali dibuat (misalnya StubClient untuk pengujian); gunakan set_client untuk menggantinya.
+    """
+    global _STORE
+    if _STORE is None:
+        with _STORE_LOCK:
+            if _STORE is None:
+                _STORE = ExplanationStore(client if client is not None else GeminiClient())
+    return _STORE
+
+
+def set_client(client):
+    """
+    Mengganti klien pada store bersama, misalnya dengan StubClient.
+    """
+    get_store(client).client = client
+
+
+_EXECUTOR = None
+
+
+def get_executor():
+    """
+    Mengembalikan thread pool bersama berukuran terbatas untuk mengambil penjelasan secara paralel.
+    """
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _STORE_LOCK:
+            if _EXECUTOR is None:
+                _EXECUTOR = ThreadPoolExecutor(
+                    max_workers=settings.EXPLANATION_WORKERS, thread_name_prefix="explanation")
+    return _EXECUTOR
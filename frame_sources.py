@@ -0,0 +1,208 @@
+import threading
+import time
+from collections import deque
+
+import cv2
+
+import settings
+
+
+class FrameRingBuffer:
+    """
+    Buffer frame berukuran tetap di antara thread decode dan thread inferensi.
+    Jika penuh, put menunggu (block=True, untuk file agar tidak ada frame terlewat) atau
+    membuang frame tertua (block=False, untuk stream langsung agar latensi tidak menumpuk).
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.dropped = 0
+        self.closed = False
+        self._frames = deque()
+        self._condition = threading.Condition()
+
+    def put(self, item, block=True):
+        with self._condition:
+            while block and len(self._frames) >= self.capacity and not self.closed:
+                self._condition.wait()
+            if self.closed:
+                return
+            if len(self._frames) >= self.capacity:
+                self._frames.popleft()
+                self.dropped += 1
+            self._frames.append(item)
+            self._condition.notify_all()
+
+    def get(self, timeout=None):
+        """
+        Mengambil frame tertua; None jika buffer ditutup dan kosong atau waktu tunggu habis.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._frames or self.closed, timeout)
+            if not self._frames:
+                return None
+            item = self._frames.popleft()
+            self._condition.notify_all()
+            return item
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+
+class FrameSource:
+    """
+    Sumber frame yang di-decode di thread latar belakang ke FrameRingBuffer.
+    Frame di antara target_fps hanya di-grab tanpa decode: untuk file berdasarkan FPS video
+    (setiap frame ke-N), untuk stream langsung berdasarkan waktu.
+    Subclass mengimplementasikan _open() yang mengembalikan cv2.VideoCapture.
+    """
+
+    # Stream langsung: frame lama dibuang, dan koneksi yang putus dibuka ulang
+    live = False
+
+    def __init__(self, target_fps=None, buffer_size=None):
+        self.target_fps = target_fps or settings.STREAM_TARGET_FPS
+        self.buffer = FrameRingBuffer(buffer_size or settings.STREAM_BUFFER_SIZE)
+        self.decoded_frames = 0
+        self.skipped_frames = 0
+        self.reconnects = 0
+        self.error = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _open(self):
+        raise NotImplementedError
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name=f"{type(self).__name__}-decode", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            backoff = 1.0
+            while not self._stop_event.is_set():
+                capture = self._open()
+                try:
+                    if capture.isOpened():
+                        backoff = 1.0
+                        self._read_frames(capture)
+                    elif not self.live:
+                        raise ValueError("Sumber video tidak dapat dibuka")
+                finally:
+                    capture.release()
+                if not self.live or self._stop_event.is_set():
+                    break
+                # Stream putus: sambung ulang dengan jeda yang makin panjang, model tetap dipakai
+                self.reconnects += 1
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, settings.RTSP_RECONNECT_MAX_SECONDS)
+        except Exception as e:
+            self.error = e
+            print(f"Error sumber frame {type(self).__name__}: {str(e)}")
+        finally:
+            self.buffer.close()
+
+    def _read_frames(self, capture):
+        source_fps = capture.get(cv2.CAP_PROP_FPS) or self.target_fps
+        stride = max(1, round(source_fps / self.target_fps))
+        interval = 1.0 / self.target_fps
+        index = -1
+        next_due = time.monotonic()
+        while not self._stop_event.is_set():
+            if not capture.grab():
+                return
+            index += 1
+            if self.live:
+                now = time.monotonic()
+                if now < next_due:
+                    self.skipped_frames += 1
+                    continue
+                next_due = max(next_due + interval, now)
+            elif index % stride:
+                self.skipped_frames += 1
+                continue
+
+            ok, frame = capture.retrieve()
+            if not ok:
+                return
+            self.decoded_frames += 1
+            self.buffer.put((index, frame), block=not self.live)
+
+    def frames(self, timeout=None):
+        """
+        Menghasilkan (indeks_frame, frame BGR) sampai sumber habis atau stop() dipanggil.
+        """
+        timeout = timeout or settings.STREAM_READ_TIMEOUT_SECONDS
+        while not self._stop_event.is_set():
+            item = self.buffer.get(timeout)
+            if item is None:
+                if self.buffer.closed:
+                    return
+                continue
+            yield item
+
+    def stop(self):
+        """
+        Menghentikan thread decode dan melepaskan sumber.
+        """
+        self._stop_event.set()
+        self.buffer.close()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+
+class VideoFileSource(FrameSource):
+    """
+    Sumber frame dari file video lokal.
+    """
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = str(path)
+
+    def _open(self):
+        return cv2.VideoCapture(self.path)
+
+
+class RTSPSource(FrameSource):
+    """
+    Sumber frame dari kamera RTSP; tersambung ulang otomatis jika koneksi putus.
+    """
+
+    live = True
+
+    def __init__(self, url, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url
+
+    def _open(self):
+        capture = cv2.VideoCapture(self.url, cv2.CAP_FFMPEG)
+        # Buffer internal OpenCV sekecil mungkin agar frame yang dibaca selalu yang terbaru
+        capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        return capture
+
+
+class YouTubeSource(FrameSource):
+    """
+    Sumber frame dari video YouTube; URL stream mp4 diambil sekali lewat pytube.
+    """
+
+    def __init__(self, url, **kwargs):
+        super().__init__(**kwargs)
+        self.url = url
+        self._stream_url = None
+
+    def _open(self):
+        if self._stream_url is None:
+            from pytube import YouTube
+
+            stream = YouTube(self.url).streams.filter(
+                progressive=True, file_extension="mp4").order_by('resolution').desc().first()
+            if stream is None:
+                raise ValueError(f"Tidak ada stream mp4 untuk {self.url}")
+            self._stream_url = stream.url
+        return cv2.VideoCapture(self._stream_url)
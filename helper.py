@@ -1,25 +1,28 @@
-from ultralytics import YOLO
 import streamlit as st
 import cv2
 from pytube import YouTube
 
 import settings
+import model_registry
 
 def load_model(model_path):
     """
     Loads a YOLO object detection model from the specified model_path.
 
+    The model is loaded once per process through model_registry, so repeated
+    calls return the same warmed-up instance.
+
     Parameters:
         model_path (str): The path to the YOLO model file.
 
     Returns:
         A YOLO object detection model.
     """
-    model = YOLO(model_path)
-    return model
+    return model_registry.get_model(model_path)
 
-def display_tracker_options():
-    display_tracker = st.radio("Display Tracker", ('Yes', 'No'))
+def display_tracker_options(default='No'):
+    # Tracking opsional: default 'No' sehingga deteksi penuh tetap berjalan di setiap frame
+    display_tracker = st.radio("Display Tracker", ('Yes', 'No'), index=('Yes', 'No').index(default))
     is_display_tracker = True if display_tracker == 'Yes' else False
     if is_display_tracker:
         tracker_type = st.radio("Tracker", ("bytetrack.yaml", "botsort.yaml"))
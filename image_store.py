@@ -0,0 +1,86 @@
+import hashlib
+import io
+import os
+import uuid
+from pathlib import Path
+
+import numpy as np
+import PIL.Image as Image
+from PIL import features
+
+import settings
+
+# Format file yang didukung beserta ekstensinya
+EXTENSIONS = {'WEBP': '.webp', 'JPEG': '.jpg'}
+
+
+class ImageStore:
+    """
+    Penyimpanan gambar berbasis isi (content-addressed) di disk.
+    Setiap gambar disimpan sekali dengan nama hash SHA-256 dari pikselnya, sehingga gambar yang
+    sama (misalnya unggahan ulang) tidak pernah ditulis dua kali. Database hanya menyimpan
+    referensi berupa nama file relatif.
+    """
+
+    def __init__(self, root_dir=None, image_format=None, quality=None):
+        self.root_dir = Path(root_dir if root_dir is not None else settings.IMAGE_STORE_DIR)
+        image_format = (image_format or settings.IMAGE_STORE_FORMAT).upper()
+        # Pillow tanpa dukungan WebP tetap bisa menyimpan sebagai JPEG
+        if image_format == 'WEBP' and not features.check('webp'):
+            image_format = 'JPEG'
+        self.image_format = image_format
+        self.quality = quality or settings.IMAGE_STORE_QUALITY
+        self.root_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def digest(image):
+        """
+        Menghitung hash SHA-256 dari mode, ukuran dan piksel gambar.
+        """
+        h = hashlib.sha256(f"{image.mode}|{image.size[0]}x{image.size[1]}|".encode())
+        h.update(image.tobytes())
+        return h.hexdigest()
+
+    def path(self, ref):
+        """
+        Mengembalikan path absolut untuk sebuah referensi.
+        """
+        return self.root_dir / ref
+
+    def put(self, image):
+        """
+        Menyimpan PIL Image atau array NumPy RGB jika belum ada dan mengembalikan referensinya.
+        """
+        image = Image.fromarray(image) if isinstance(image, np.ndarray) else image.convert('RGB')
+        digest = self.digest(image)
+        ref = f"{digest[:2]}/{digest}{EXTENSIONS[self.image_format]}"
+        path = self.path(ref)
+        if path.exists():
+            return ref
+
+        buffer = io.BytesIO()
+        image.save(buffer, format=self.image_format, quality=self.quality)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Nama sementara unik agar dua penulis untuk hash yang sama tidak saling menimpa setengah jadi
+        temp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        temp_path.write_bytes(buffer.getvalue())
+        os.replace(temp_path, path)  # Ganti secara atomik agar pembaca tidak melihat file setengah jadi
+        return ref
+
+    def get(self, ref):
+        """
+        Membuka gambar untuk referensi, atau None jika file tidak ditemukan.
+        """
+        path = self.path(ref)
+        if not path.exists():
+            return None
+        return Image.open(path)
+
+    def delete(self, ref):
+        """
+        Menghapus file untuk referensi jika ada.
+        """
+        try:
+            self.path(ref).unlink()
+        except FileNotFoundError:
+            pass
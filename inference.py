@@ -0,0 +1,236 @@
+import hashlib
+import io
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+
+import cv2
+import numpy as np
+import PIL.Image as Image
+
+import metrics
+import settings
+
+# Hasil deteksi satu gambar dalam bentuk array NumPy:
+# xyxy (N, 4) float32, conf (N,) float32, cls (N,) int
+Detections = namedtuple('Detections', ['xyxy', 'conf', 'cls'])
+
+# Gambar hasil decode beserta hash SHA-256 dari byte file aslinya.
+# image adalah array NumPy RGB (H, W, 3) read-only yang dipakai bersama oleh pratinjau dan inferensi.
+DecodedImage = namedtuple('DecodedImage', ['name', 'image', 'digest', 'error'])
+
+# Transformasi untuk setiap nilai tag EXIF Orientation (0x0112)
+EXIF_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+def _decode_image(source, max_side=None):
+    """
+    Men-decode satu file gambar menjadi array RGB dengan orientasi EXIF sudah diterapkan.
+    Jika max_side diatur, JPEG di-decode langsung pada skala 1/2, 1/4 atau 1/8 (draft mode) lalu
+    diperkecil sehingga sisi terpanjang paling besar max_side; gambar resolusi penuh tidak pernah
+    dibuat di memori.
+    """
+    name = getattr(source, 'name', str(source))
+    try:
+        data = source.getvalue() if hasattr(source, 'getvalue') else Path(source).read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        image = Image.open(io.BytesIO(data))  # Hanya membaca header
+        orientation = image.getexif().get(0x0112, 1)
+        if max_side:
+            # Batas persegi karena orientasi EXIF bisa menukar lebar dan tinggi
+            image.draft('RGB', (max_side, max_side))
+        image = image.convert('RGB')  # Memaksa decode di thread pekerja, bukan saat inferensi
+        if max_side and max(image.size) > max_side:
+            image.thumbnail((max_side, max_side), Image.Resampling.BILINEAR)
+        # Rotasi dilakukan setelah diperkecil agar lebih murah
+        if orientation in EXIF_TRANSPOSE:
+            image = image.transpose(EXIF_TRANSPOSE[orientation])
+        array = np.asarray(image)
+        return DecodedImage(name, array, digest, None)
+    except Exception as e:
+        return DecodedImage(name, None, None, e)
+
+
+def _decode_image_timed(source, max_side=None):
+    with metrics.span('decode_image'):
+        return _decode_image(source, max_side)
+
+
+def decode_images(sources, max_workers=None, max_side=None):
+    """
+    Men-decode beberapa file gambar secara paralel (lihat _decode_image untuk max_side).
+    Mengembalikan list DecodedImage dengan urutan yang sama dengan sources.
+    """
+    max_workers = max_workers or settings.DECODE_WORKERS
+    if len(sources) <= 1:
+        return [_decode_image_timed(source, max_side) for source in sources]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(sources))) as executor:
+        return list(executor.map(lambda source: _decode_image_timed(source, max_side), sources))
+
+
+def iter_batches(items, batch_size):
+    """
+    Membagi list menjadi potongan berukuran tetap (potongan terakhir bisa lebih kecil).
+    """
+    for start in range(0, len(items), batch_size):
+        yield start, items[start:start + batch_size]
+
+
+def predict_args(confidence, iou=None, max_det=None, classes=None, imgsz=None):
+    """
+    Membuat argumen lengkap untuk model.predict; nilai None diganti default dari settings.
+    Model ultralytics menyimpan argumen predict sebelumnya, jadi setiap panggilan pada model bersama
+    harus meneruskan semua parameter agar filter atau ukuran dari sesi lain tidak ikut terpakai.
+    """
+    return {
+        'conf': confidence,
+        'iou': iou if iou is not None else settings.PREDICT_IOU,
+        'max_det': max_det if max_det is not None else settings.PREDICT_MAX_DET,
+        'classes': classes if classes is not None else settings.PREDICT_CLASSES,
+        'imgsz': imgsz if imgsz is not None else settings.EXPORT_IMGSZ,
+    }
+
+
+def predict_batches(model, images, confidence, batch_size=None, lock=None, **kwargs):
+    """
+    Menjalankan model pada gambar (PIL Image atau array NumPy RGB) dalam batch berukuran tetap.
+    Menghasilkan (indeks_awal, hasil_batch) segera setelah setiap batch selesai, sehingga
+    pemanggil dapat menampilkan hasil secara bertahap. kwargs (iou, max_det, classes, imgsz)
+    diteruskan ke predict_args.
+    """
+    batch_size = batch_size or settings.UPLOAD_BATCH_SIZE
+    args = predict_args(confidence, **kwargs)
+    for start, batch in iter_batches(images, batch_size):
+        # ultralytics menganggap array NumPy sebagai BGR; view terbalik tidak menyalin piksel
+        batch = [image[:, :, ::-1] if isinstance(image, np.ndarray) else image for image in batch]
+        with lock if lock is not None else nullcontext():
+            with metrics.span('predict_batch'):
+                results = model.predict(batch, verbose=False, **args)
+        metrics.increment('predicted_images', len(batch))
+        yield start, results
+
+
+def boxes_to_arrays(result, min_confidence=0.0, scale=None):
+    """
+    Memindahkan xyxy, conf dan cls dari hasil ultralytics ke NumPy sekali per gambar,
+    menyaring dengan mask confidence, dan menskalakan semua kotak dalam satu operasi array.
+    scale adalah (scale_x, scale_y) untuk mengembalikan koordinat ke resolusi asli.
+    """
+    boxes = result.boxes.cpu().numpy()
+    xyxy = boxes.xyxy.astype(np.float32, copy=False)
+    conf = boxes.conf.astype(np.float32, copy=False)
+    cls = boxes.cls.astype(int)
+
+    if min_confidence > 0:
+        keep = conf >= min_confidence
+        xyxy, conf, cls = xyxy[keep], conf[keep], cls[keep]
+
+    if scale is not None:
+        scale_x, scale_y = scale
+        xyxy = xyxy * np.array([scale_x, scale_y, scale_x, scale_y], dtype=np.float32)
+
+    return Detections(xyxy, conf, cls)
+
+
+def detect_frame(model, img, confidence, iou=None, max_det=None, classes=None,
+                 resize_dim=None, lock=None, imgsz=None):
+    """
+    Mendeteksi satu frame BGR dan mengembalikan Detections pada resolusi frame asli.
+    Dipakai bersama oleh webcam dan sumber video/RTSP/YouTube. resize_dim adalah (lebar, tinggi)
+    opsional untuk memperkecil frame sebelum inferensi; imgsz (tinggi, lebar) opsional diteruskan
+    ke model, misalnya sama dengan resize_dim yang sudah selaras stride agar tidak di-letterbox lagi.
+    Parameter None memakai default dari settings (lihat predict_args).
+    """
+    img_resized = cv2.resize(img, resize_dim) if resize_dim else img
+
+    # Threshold dan filter kelas diterapkan di dalam NMS, bukan setelah hasil dibuat
+    args = predict_args(confidence, iou, max_det, classes, imgsz)
+    with lock if lock is not None else nullcontext():
+        with metrics.span('predict_frame'):
+            result = model.predict(img_resized, verbose=False, **args)[0]
+
+    # Skala untuk mengembalikan koordinat ke frame asli jika frame di-resize sebelum deteksi
+    scale = None
+    if resize_dim:
+        original_h, original_w = img.shape[:2]
+        resized_w, resized_h = resize_dim
+        scale = (original_w / resized_w, original_h / resized_h)
+    return boxes_to_arrays(result, scale=scale)
+
+
+class AsyncInferenceWorker:
+    """
+    Thread inferensi latar belakang untuk stream video.
+    Antrean hanya menampung satu frame: frame yang belum sempat diproses diganti frame terbaru,
+    sehingga latensi tidak menumpuk ketika inferensi lebih lambat dari laju frame kamera.
+    """
+
+    def __init__(self, infer_fn, target_fps=None):
+        self.infer_fn = infer_fn
+        self.target_fps = target_fps if target_fps is not None else settings.WEBCAM_TARGET_FPS
+        self.latest_result = None
+        self.latest_seconds = None
+        # Latensi end-to-end frame terakhir: sejak submit sampai hasil siap (termasuk waktu antre)
+        self.latest_latency = None
+        self.dropped_frames = 0
+        self._queue = queue.Queue(maxsize=1)
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="inference-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, frame):
+        """
+        Menyerahkan frame terbaru tanpa menunggu; frame lama yang masih antre dibuang.
+        """
+        try:
+            self._queue.get_nowait()
+            self.dropped_frames += 1
+            metrics.increment('dropped_frames')
+        except queue.Empty:
+            pass
+        try:
+            self._queue.put_nowait((frame, time.perf_counter()))
+        except queue.Full:
+            self.dropped_frames += 1
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                frame, submitted = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            start = time.perf_counter()
+            try:
+                self.latest_result = self.infer_fn(frame)
+            except Exception as e:
+                print(f"Error inferensi pada worker: {str(e)}")
+            self.latest_seconds = time.perf_counter() - start
+            self.latest_latency = time.perf_counter() - submitted
+            metrics.observe('frame_inference', self.latest_seconds)
+            metrics.observe('frame_latency', self.latest_latency)
+
+            # Batasi laju inferensi ke target_fps (0 atau None = secepat mungkin)
+            if self.target_fps:
+                remaining = 1.0 / self.target_fps - (time.perf_counter() - start)
+                if remaining > 0:
+                    self._stop_event.wait(remaining)
+
+    def stop(self):
+        """
+        Menghentikan thread pekerja.
+        """
+        self._stop_event.set()
+        self._thread.join(timeout=2)
@@ -0,0 +1,195 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import settings
+
+# Batas bucket histogram durasi (detik), kira-kira eksponensial dari 0.5 ms sampai 60 detik
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """
+    Histogram durasi dengan bucket tetap: observe hanya bisect dan increment, sehingga murah
+    untuk dipakai di jalur panas. Persentil diperkirakan dengan interpolasi linear di dalam bucket.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Bucket terakhir: lebih besar dari batas tertinggi
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        """
+        Perkiraan persentil q (0-1); None jika belum ada data.
+        """
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.max
+                # Batas atas tidak melebihi nilai terbesar yang pernah diamati
+                upper = min(upper, self.max)
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.max
+
+
+class MetricsRegistry:
+    """
+    Kumpulan counter dan histogram durasi bernama untuk seluruh proses.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.started_at = time.time()
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name, value=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def span(self, name):
+        """
+        Mengukur durasi blok with dan mencatatnya di histogram name (juga jika terjadi error).
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self):
+        """
+        Mengembalikan (counters, spans): counters {nama: nilai} dan spans berupa list dict
+        berisi name, count, sum, p50, p95, p99 dan max (detik), urut total waktu terbesar.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            spans = [{
+                'name': name,
+                'count': histogram.count,
+                'sum': histogram.sum,
+                'p50': histogram.percentile(0.50),
+                'p95': histogram.percentile(0.95),
+                'p99': histogram.percentile(0.99),
+                'max': histogram.max,
+            } for name, histogram in self._histograms.items()]
+        spans.sort(key=lambda span: span['sum'], reverse=True)
+        return counters, spans
+
+    def to_prometheus(self, prefix='paddy_'):
+        """
+        Mengekspor semua metrik dalam format teks Prometheus.
+        """
+        lines = []
+        with self._lock:
+            for name, value in sorted(self._counters.items()):
+                metric = f"{prefix}{name}_total"
+                lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+            for name, histogram in sorted(self._histograms.items()):
+                metric = f"{prefix}{name}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.buckets, histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{le="+Inf"}} {histogram.count}')
+                lines.append(f"{metric}_sum {histogram.sum}")
+                lines.append(f"{metric}_count {histogram.count}")
+        metric = f"{prefix}uptime_seconds"
+        lines += [f"# TYPE {metric} gauge", f"{metric} {time.time() - self.started_at:.0f}"]
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+REGISTRY = MetricsRegistry(settings.METRICS_ENABLED)
+
+# Alias level modul agar pemanggil cukup menulis metrics.span("nama")
+increment = REGISTRY.increment
+observe = REGISTRY.observe
+span = REGISTRY.span
+snapshot = REGISTRY.snapshot
+to_prometheus = REGISTRY.to_prometheus
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = to_prometheus().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Jangan mencetak setiap scrape ke log
+
+
+_SERVER = None
+_SERVER_LOCK = threading.Lock()
+# Error terakhir saat membuka endpoint, agar aplikasi bisa menampilkan peringatan tanpa mencoba ulang
+server_error = None
+
+
+def start_http_server(port=None, host=None):
+    """
+    Menjalankan endpoint /metrics untuk Prometheus di thread latar belakang (sekali per proses).
+    Tidak melakukan apa pun jika port dan settings.METRICS_PORT bernilai None. Secara default
+    hanya mendengarkan di settings.METRICS_HOST (127.0.0.1), bukan di semua antarmuka jaringan.
+    """
+    global _SERVER, server_error
+    port = port if port is not None else settings.METRICS_PORT
+    host = host if host is not None else settings.METRICS_HOST
+    if port is None:
+        return None
+    with _SERVER_LOCK:
+        if _SERVER is None and server_error is None:
+            try:
+                _SERVER = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                server_error = e
+                print(f"Error menjalankan endpoint metrik di {host}:{port}: {str(e)}")
+                return None
+            threading.Thread(
+                target=_SERVER.serve_forever, name="metrics-http", daemon=True).start()
+    return _SERVER
@@ -0,0 +1,155 @@
+import argparse
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+
+import settings
+
+# Format ekspor ultralytics untuk setiap backend inferensi beserta nama artefak yang dihasilkan
+# (artefak ditulis oleh ultralytics di folder yang sama dengan file .pt sumber)
+BACKENDS = {
+    'pytorch': None,
+    'torchscript': {'format': 'torchscript', 'suffix': '.torchscript', 'args': {}},
+    'onnx': {'format': 'onnx', 'suffix': '.onnx', 'args': {'dynamic': True, 'simplify': True}},
+    'openvino': {'format': 'openvino', 'suffix': '_openvino_model', 'args': {'dynamic': True}},
+}
+
+# Hasil resolve_model_path per (backend, source, mtime) agar checksum tidak dihitung ulang setiap rerun
+_RESOLVED = {}
+# Sesi yang terhubung bersamaan tidak boleh mengekspor ke artefak dan manifest yang sama sekaligus
+_RESOLVE_LOCK = threading.Lock()
+
+
+def _sha256(path):
+    """
+    Menghitung checksum SHA-256 untuk sebuah file atau seluruh isi folder (urut nama file).
+    """
+    path = Path(path)
+    digest = hashlib.sha256()
+    files = sorted(p for p in path.rglob('*') if p.is_file()) if path.is_dir() else [path]
+    for file in files:
+        if path.is_dir():
+            digest.update(str(file.relative_to(path)).encode())
+        with open(file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def supports_dynamic_input(backend=None):
+    """
+    True jika backend menerima ukuran input selain EXPORT_IMGSZ (pytorch atau ekspor dinamis).
+    """
+    config = BACKENDS[backend or settings.INFERENCE_BACKEND]
+    return config is None or config['args'].get('dynamic', False)
+
+
+def artifact_path(backend, source=None):
+    """
+    Mengembalikan path artefak hasil ekspor untuk backend tertentu.
+    """
+    source = Path(source if source is not None else settings.DETECTION_MODEL)
+    spec = BACKENDS[backend]
+    if spec is None:
+        return source
+    return source.with_name(source.stem + spec['suffix'])
+
+
+def _checksum_path(artifact):
+    return Path(str(artifact) + '.sha256.json')
+
+
+def verify_artifact(backend, source=None):
+    """
+    Memeriksa bahwa artefak ekspor ada, belum berubah, dan dibuat dari file .pt sumber yang sama.
+    """
+    source = Path(source if source is not None else settings.DETECTION_MODEL)
+    artifact = artifact_path(backend, source)
+    checksum_file = _checksum_path(artifact)
+    if not artifact.exists() or not checksum_file.exists():
+        return False
+    try:
+        with open(checksum_file) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return (manifest.get('source_sha256') == _sha256(source)
+            and manifest.get('artifact_sha256') == _sha256(artifact)
+            and manifest.get('imgsz') == settings.EXPORT_IMGSZ)
+
+
+def export_model(backend, source=None, force=False):
+    """
+    Mengekspor file .pt ke runtime backend (ONNX, OpenVINO, TorchScript) dan menulis checksum-nya.
+    Ekspor dilewati jika artefak yang valid sudah ada, kecuali force=True.
+    """
+    source = Path(source if source is not None else settings.DETECTION_MODEL)
+    if BACKENDS[backend] is None:
+        return source
+    artifact = artifact_path(backend, source)
+    if not force and verify_artifact(backend, source):
+        return artifact
+
+    from ultralytics import YOLO
+
+    spec = BACKENDS[backend]
+    start = time.perf_counter()
+    exported = YOLO(str(source)).export(
+        format=spec['format'], imgsz=settings.EXPORT_IMGSZ, device='cpu', **spec['args'])
+    if Path(exported).resolve() != artifact.resolve():
+        raise RuntimeError(f"Artefak ekspor tidak ditemukan di lokasi yang diharapkan: {exported}")
+
+    manifest = {
+        'backend': backend,
+        'source': source.name,
+        'source_sha256': _sha256(source),
+        'artifact_sha256': _sha256(artifact),
+        'imgsz': settings.EXPORT_IMGSZ,
+        'exported_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    with open(_checksum_path(artifact), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Model diekspor ke {backend} dalam {time.perf_counter() - start:.1f} s: {artifact}")
+    return artifact
+
+
+def resolve_model_path(backend=None, source=None):
+    """
+    Mengembalikan path model yang harus dimuat untuk backend yang dipilih di settings.INFERENCE_BACKEND.
+    Jika ekspor gagal, kembali ke file PyTorch .pt asli agar aplikasi tetap berjalan.
+    """
+    backend = backend if backend is not None else settings.INFERENCE_BACKEND
+    source = Path(source if source is not None else settings.DETECTION_MODEL)
+    if backend not in BACKENDS:
+        raise ValueError(f"INFERENCE_BACKEND tidak dikenal: {backend}. Pilihan: {', '.join(BACKENDS)}")
+    key = (backend, str(source), source.stat().st_mtime)
+    path = _RESOLVED.get(key)
+    if path is not None:
+        return path
+    with _RESOLVE_LOCK:
+        path = _RESOLVED.get(key)
+        if path is not None:
+            return path
+        try:
+            path = export_model(backend, source)
+        except Exception as e:
+            print(f"Error ekspor model ke {backend}, memakai {source}: {str(e)}")
+            path = source
+        _RESOLVED[key] = path
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ekspor model deteksi ke runtime CPU yang dioptimalkan.")
+    parser.add_argument('--backend', nargs='+', default=[settings.INFERENCE_BACKEND],
+                        choices=list(BACKENDS), help="Backend tujuan ekspor")
+    parser.add_argument('--source', default=str(settings.DETECTION_MODEL), help="Path file .pt sumber")
+    parser.add_argument('--force', action='store_true', help="Ekspor ulang walaupun artefak valid sudah ada")
+    args = parser.parse_args()
+
+    for backend in args.backend:
+        path = export_model(backend, args.source, force=args.force)
+        valid = BACKENDS[backend] is None or verify_artifact(backend, args.source)
+        print(f"{backend}: {path} ({'valid' if valid else 'TIDAK VALID'})")
@@ -0,0 +1,147 @@
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+from ultralytics import YOLO
+
+import metrics
+import model_export
+import settings
+
+
+@dataclass
+class ModelEntry:
+    """
+    Satu model YOLO yang sudah dimuat beserta statistik pemuatannya.
+    """
+    model: YOLO
+    path: str
+    mtime: float
+    device: str
+    load_seconds: float
+    warmup_seconds: float
+    rss_mb: float
+    rss_delta_mb: float
+    loaded_at: float = field(default_factory=time.time)
+    # Prediktor ultralytics tidak thread-safe, jadi inferensi pada model bersama diserialkan.
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @property
+    def version(self):
+        """
+        Identitas versi model (nama file dan mtime), dipakai sebagai bagian kunci cache hasil.
+        """
+        return f"{Path(self.path).name}@{self.mtime:.0f}"
+
+
+# Registry level proses: satu instance model per (path, mtime, device)
+_REGISTRY = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def _resident_memory_mb():
+    """
+    Mengembalikan resident memory proses saat ini dalam MB.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss dalam KB di Linux (puncak, bukan nilai saat ini)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _warmup(model, device):
+    """
+    Menjalankan satu inferensi dummy agar graf dan alokator sudah siap sebelum request pertama.
+    """
+    dummy = np.zeros((settings.EXPORT_IMGSZ, settings.EXPORT_IMGSZ, 3), dtype=np.uint8)
+    start = time.perf_counter()
+    model.predict(dummy, device=device, verbose=False)
+    return time.perf_counter() - start
+
+
+def _resolve_key(model_path, device):
+    # Tanpa path eksplisit, pakai artefak dari settings.INFERENCE_BACKEND (diekspor bila perlu)
+    if model_path is None:
+        model_path = model_export.resolve_model_path()
+    path = str(Path(model_path).resolve())
+    mtime = os.path.getmtime(path)
+    device = device if device is not None else settings.DEVICE
+    return path, mtime, device
+
+
+def get_entry(model_path=None, device=None):
+    """
+    Mengembalikan ModelEntry bersama untuk model_path dan device, memuatnya sekali per proses.
+    Tanpa model_path, dipakai model untuk settings.INFERENCE_BACKEND.
+    Jika file bobot berubah (mtime berbeda), model dimuat ulang dan entri lama dibuang.
+    """
+    key = _resolve_key(model_path, device)
+    entry = _REGISTRY.get(key)
+    if entry is not None:
+        return entry
+
+    with _REGISTRY_LOCK:
+        entry = _REGISTRY.get(key)
+        if entry is not None:
+            return entry
+
+        path, mtime, device = key
+        rss_before = _resident_memory_mb()
+        start = time.perf_counter()
+        model = YOLO(path, task='detect')
+        load_seconds = time.perf_counter() - start
+        warmup_seconds = _warmup(model, device)
+        metrics.observe('model_load', load_seconds)
+        metrics.observe('model_warmup', warmup_seconds)
+        rss_after = _resident_memory_mb()
+
+        # Buang versi lama dari file bobot yang sama agar memorinya bisa dibebaskan
+        for old_key in [k for k in _REGISTRY if k[0] == path and k[2] == device]:
+            del _REGISTRY[old_key]
+
+        entry = ModelEntry(
+            model=model,
+            path=path,
+            mtime=mtime,
+            device=device,
+            load_seconds=load_seconds,
+            warmup_seconds=warmup_seconds,
+            rss_mb=rss_after,
+            rss_delta_mb=rss_after - rss_before,
+        )
+        _REGISTRY[key] = entry
+        print(f"Model {path} dimuat dalam {load_seconds * 1000:.0f} ms "
+              f"(warm-up {warmup_seconds * 1000:.0f} ms, +{entry.rss_delta_mb:.0f} MB RSS)")
+        return entry
+
+
+def get_model(model_path=None, device=None):
+    """
+    Mengembalikan instance YOLO bersama yang sudah di-warm-up.
+    """
+    return get_entry(model_path, device).model
+
+
+def model_stats():
+    """
+    Mengembalikan statistik semua model yang sedang dimuat, untuk ditampilkan di UI atau log.
+    """
+    return [
+        {
+            'path': entry.path,
+            'device': entry.device,
+            'load_ms': entry.load_seconds * 1000,
+            'warmup_ms': entry.warmup_seconds * 1000,
+            'rss_mb': entry.rss_mb,
+            'rss_delta_mb': entry.rss_delta_mb,
+            'loaded_at': entry.loaded_at,
+        }
+        for entry in list(_REGISTRY.values())
+    ]
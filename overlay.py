@@ -0,0 +1,99 @@
+import threading
+
+import cv2
+import numpy as np
+
+# Properti label, sama dengan tampilan deteksi webcam sebelumnya
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+FONT_SCALE = 1.8  # Ukuran font 2x lebih besar dari 0.9
+FONT_THICKNESS = 2
+TEXT_COLOR = (255, 255, 255)  # Putih
+BG_COLOR = (0, 0, 0)  # Hitam
+BOX_COLOR = (0, 255, 0)  # Hijau
+BOX_THICKNESS = 2
+PADDING_X = 10
+PADDING_Y = 5
+# Jarak baseline teks di atas sisi atas kotak
+TEXT_OFFSET_Y = 10
+
+
+class OverlayRenderer:
+    """
+    Penggambar kotak deteksi dengan cache sprite label.
+    Latar hitam dan teks label dirender sekali per (kelas, persentase confidence) lalu
+    cukup disalin ke frame, sehingga cv2.getTextSize/cv2.putText tidak dipanggil setiap frame.
+    """
+
+    def __init__(self, max_sprites=1024):
+        self.max_sprites = max_sprites
+        self._sprites = {}
+        self._lock = threading.Lock()
+
+    def _render_sprite(self, text):
+        (text_width, text_height), baseline = cv2.getTextSize(
+            text, FONT, FONT_SCALE, FONT_THICKNESS)
+        # +1 karena cv2.rectangle mengisi sampai titik kanan bawah secara inklusif
+        sprite_h = text_height + baseline + PADDING_Y * 2 + 1
+        sprite_w = text_width + PADDING_X * 2 + 1
+        sprite = np.full((sprite_h, sprite_w, 3), BG_COLOR, dtype=np.uint8)
+        cv2.putText(sprite, text, (PADDING_X, PADDING_Y + text_height),
+                    FONT, FONT_SCALE, TEXT_COLOR, FONT_THICKNESS, cv2.LINE_AA)
+        # Offset sudut kiri atas sprite relatif terhadap (x1, y1) kotak
+        offset_y = -(TEXT_OFFSET_Y + text_height + PADDING_Y)
+        return sprite, offset_y
+
+    def get_sprite(self, label, confidence):
+        """
+        Mengembalikan (sprite, offset_y) untuk label dan confidence yang dibulatkan ke persen.
+        """
+        key = (label, f"{confidence:.0%}")
+        cached = self._sprites.get(key)
+        if cached is None:
+            cached = self._render_sprite(f"{key[0]} {key[1]}")
+            with self._lock:
+                if len(self._sprites) >= self.max_sprites:
+                    self._sprites.clear()
+                self._sprites[key] = cached
+        return cached
+
+    def draw(self, img, xyxy, labels, confidences):
+        """
+        Menggambar kotak dan label pada img (BGR, in-place) lalu mengembalikan img.
+        """
+        img_h, img_w = img.shape[:2]
+        # Semua kotak digambar dulu agar garis kotak (termasuk kotak lain) tidak menimpa label
+        for x1, y1, x2, y2 in xyxy:
+            cv2.rectangle(img, (x1, y1), (x2, y2), BOX_COLOR, BOX_THICKNESS)
+
+        for (x1, y1, _, _), label, confidence in zip(xyxy, labels, confidences):
+            sprite, offset_y = self.get_sprite(label, confidence)
+
+            # Salin sprite ke frame, dipotong pada batas gambar
+            top = y1 + offset_y
+            left = x1
+            src_top = max(0, -top)
+            src_left = max(0, -left)
+            dst_top = max(0, top)
+            dst_left = max(0, left)
+            h = min(sprite.shape[0] - src_top, img_h - dst_top)
+            w = min(sprite.shape[1] - src_left, img_w - dst_left)
+            if h > 0 and w > 0:
+                img[dst_top:dst_top + h, dst_left:dst_left + w] = \
+                    sprite[src_top:src_top + h, src_left:src_left + w]
+        return img
+
+
+_DEFAULT_RENDERER = OverlayRenderer()
+
+
+def draw_detections(img, detections, names, renderer=None, track_ids=None):
+    """
+    Menggambar inference.Detections pada img (BGR, in-place) dengan renderer bersama.
+    Jika track_ids diberikan, ID track ditampilkan di depan label.
+    """
+    renderer = renderer or _DEFAULT_RENDERER
+    xyxy = detections.xyxy.astype(int).tolist()
+    labels = [names[c] for c in detections.cls.tolist()]
+    if track_ids is not None:
+        labels = [f"#{track_id} {label}" for track_id, label in zip(track_ids, labels)]
+    return renderer.draw(img, xyxy, labels, detections.conf.tolist())
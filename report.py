@@ -0,0 +1,192 @@
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import PIL.Image as Image
+from fpdf import FPDF
+
+import settings
+
+
+def clean_markdown(text):
+    """Membersihkan format markdown dari teks untuk output PDF."""
+    text = text.replace('**', '')
+    text = text.replace('*', '')
+    text = text.replace('#', '')
+    text = text.replace('`', '')
+    return text
+
+
+def encode_jpeg(image, quality=None):
+    """
+    Meng-encode PIL Image menjadi byte JPEG di memori untuk disematkan ke PDF.
+    """
+    quality = quality if quality is not None else settings.PDF_IMAGE_QUALITY
+    buffer = io.BytesIO()
+    image.convert('RGB').save(buffer, format='JPEG', quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def _line(pdf, text, align=''):
+    """Menulis satu baris cell lalu pindah ke awal baris berikutnya."""
+    pdf.cell(190, 10, text, border=0, new_x='LMARGIN', new_y='NEXT', align=align)
+
+
+def create_detection_pdf(image, label, confidence, explanation):
+    """
+    Membuat file PDF yang berisi hasil deteksi, gambar, dan penjelasan.
+    image dapat berupa PIL Image atau byte JPEG yang sudah di-encode (lihat encode_jpeg);
+    seluruh proses berjalan di memori tanpa file sementara.
+    Fungsi ini tidak bergantung pada Streamlit sehingga dapat dijalankan di thread pekerja;
+    error diteruskan ke pemanggil.
+    """
+    image_bytes = image if isinstance(image, (bytes, bytearray)) else encode_jpeg(image)
+
+    pdf = FPDF()
+    pdf.add_page()
+
+    pdf.set_font('Helvetica', 'B', 18)
+    _line(pdf, 'Hasil Deteksi Penyakit Daun Padi', align='C')
+    pdf.ln(10)
+
+    current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    _line(pdf, f'Waktu Deteksi: {current_time}')
+    pdf.ln(5)
+
+    pdf.set_font('Helvetica', 'B', 14)
+    # Mengubah format confidence menjadi persentase
+    _line(pdf, f'Penyakit Terdeteksi: {label}')
+    _line(pdf, f'Tingkat Kepercayaan: {confidence:.0%}') # Mengubah format ke persen
+    pdf.ln(5)
+
+    # Gambar disematkan langsung dari byte JPEG di memori
+    _line(pdf, 'Gambar Daun Padi:')
+    pdf.image(io.BytesIO(image_bytes), x=10, y=None, w=180)
+
+    pdf.add_page()
+    pdf.set_font('Helvetica', 'B', 16)
+    _line(pdf, 'Analisis dan Rekomendasi:')
+    pdf.ln(5)
+
+    _write_explanation(pdf, explanation)
+
+    # PDF ditulis langsung ke buffer di memori
+    return bytes(pdf.output())
+
+
+def _write_explanation(pdf, explanation):
+    """Menulis teks penjelasan Gemini dengan judul bagian dicetak tebal."""
+    pdf.set_font('Helvetica', '', 14)
+    explanation_lines = explanation.split('\n')
+
+    current_mode = 'normal'
+    for line in explanation_lines:
+        clean_line = clean_markdown(line)
+
+        # Deteksi judul bagian dalam penjelasan
+        if "Penjelasan:" in clean_line or "Dampak:" in clean_line or "Rekomendasi" in clean_line:
+            pdf.ln(5)
+            pdf.set_font('Helvetica', 'B', 14)
+            current_mode = 'title'
+        elif clean_line.strip() == "":
+            pdf.ln(5)
+            pdf.set_font('Helvetica', '', 14)
+            current_mode = 'normal'
+        else:
+            if current_mode == 'title':
+                pdf.set_font('Helvetica', '', 14)
+                current_mode = 'normal'
+
+        pdf.multi_cell(0, 6, clean_line, new_x='LMARGIN', new_y='NEXT')
+
+
+def create_consolidated_pdf(image, boxes, explanations):
+    """
+    Membuat satu laporan PDF untuk semua deteksi pada sebuah gambar.
+    Gambar hasil deteksi disematkan sekali, setiap kotak mendapat thumbnail potongan kecil,
+    dan penjelasan ditulis sekali per label unik.
+    boxes: list (label, confidence, (x1, y1, x2, y2)); explanations: {label: teks penjelasan}.
+    """
+    if isinstance(image, (bytes, bytearray)):
+        image = Image.open(io.BytesIO(image))
+    image = image.convert('RGB')
+
+    pdf = FPDF()
+    pdf.add_page()
+
+    pdf.set_font('Helvetica', 'B', 18)
+    _line(pdf, 'Laporan Deteksi Penyakit Daun Padi', align='C')
+    pdf.ln(10)
+
+    current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    _line(pdf, f'Waktu Deteksi: {current_time}')
+    pdf.ln(5)
+
+    pdf.set_font('Helvetica', 'B', 14)
+    label_counts = {}
+    for label, _, _ in boxes:
+        label_counts[label] = label_counts.get(label, 0) + 1
+    _line(pdf, f'Jumlah Deteksi: {len(boxes)}')
+    for label, count in label_counts.items():
+        _line(pdf, f'- {label}: {count}')
+    pdf.ln(5)
+
+    _line(pdf, 'Gambar Daun Padi:')
+    pdf.image(io.BytesIO(encode_jpeg(image)), x=10, y=None, w=180)
+
+    pdf.add_page()
+    pdf.set_font('Helvetica', 'B', 16)
+    _line(pdf, 'Rincian Deteksi:')
+    pdf.ln(2)
+
+    thumb_w = settings.REPORT_THUMBNAIL_MM
+    for index, (label, confidence, (x1, y1, x2, y2)) in enumerate(boxes, start=1):
+        crop = image.crop((max(0, int(x1)), max(0, int(y1)),
+                           min(image.width, int(x2)), min(image.height, int(y2))))
+        crop.thumbnail((settings.REPORT_THUMBNAIL_PX, settings.REPORT_THUMBNAIL_PX))
+        thumb_h = thumb_w * crop.height / max(crop.width, 1)
+        if pdf.get_y() + thumb_h > pdf.page_break_trigger:
+            pdf.add_page()
+
+        top = pdf.get_y()
+        pdf.image(io.BytesIO(encode_jpeg(crop)), x=10, y=top, w=thumb_w)
+        pdf.set_xy(15 + thumb_w, top)
+        pdf.set_font('Helvetica', 'B', 14)
+        pdf.cell(0, 8, f'{index}. {label}', new_x='LEFT', new_y='NEXT')
+        pdf.set_font('Helvetica', '', 12)
+        pdf.cell(0, 8, f'Tingkat Kepercayaan: {confidence:.0%}', new_x='LMARGIN', new_y='NEXT')
+        pdf.set_y(max(pdf.get_y(), top + thumb_h) + 4)
+
+    pdf.add_page()
+    pdf.set_font('Helvetica', 'B', 16)
+    _line(pdf, 'Analisis dan Rekomendasi:')
+    for label in label_counts:
+        explanation = explanations.get(label)
+        if not explanation:
+            continue
+        pdf.ln(5)
+        pdf.set_font('Helvetica', 'B', 16)
+        _line(pdf, label)
+        _write_explanation(pdf, explanation)
+
+    return bytes(pdf.output())
+
+
+_EXECUTOR = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def get_executor():
+    """
+    Mengembalikan thread pool bersama berukuran terbatas untuk membangun PDF.
+    Satu laporan hanya butuh beberapa milidetik, sedangkan proses pekerja 'spawn' di bawah
+    Streamlit mengimpor ulang app.py (ultralytics, torch) sehingga jauh lebih mahal.
+    """
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        with _EXECUTOR_LOCK:
+            if _EXECUTOR is None:
+                _EXECUTOR = ThreadPoolExecutor(
+                    max_workers=settings.PDF_WORKERS, thread_name_prefix="pdf-report")
+    return _EXECUTOR
@@ -0,0 +1,160 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+import metrics
+import settings
+from inference import Detections
+
+
+class DetectionCache:
+    """
+    Cache hasil deteksi berdasarkan hash isi gambar, versi model dan parameter inferensi.
+    Hasil disimpan di memori dengan batas LRU dan, jika disk_dir diatur, juga sebagai file .npz
+    sehingga tetap tersedia setelah aplikasi dimulai ulang. File disk dibatasi jumlah dan umurnya
+    (disk_max_entries, disk_max_age_days; None = tanpa batas) dan dipangkas setiap
+    prune_every kali put.
+    """
+
+    def __init__(self, max_entries=256, disk_dir=None, disk_max_entries=None,
+                 disk_max_age_days=None, prune_every=64):
+        self.max_entries = max_entries
+        self.disk_dir = Path(disk_dir) if disk_dir is not None else None
+        self.disk_max_entries = disk_max_entries
+        self.disk_max_age_days = disk_max_age_days
+        self.prune_every = prune_every
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._prune_lock = threading.Lock()
+        self._puts_since_prune = prune_every  # Pangkas pada put pertama setelah aplikasi dimulai
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(image_digest, model_version, args):
+        """
+        Membuat kunci cache dari hash gambar, versi model dan argumen predict lengkap
+        (lihat inference.predict_args): confidence, IoU, max_det, filter kelas dan imgsz.
+        """
+        classes = ",".join(str(c) for c in sorted(args['classes'])) if args['classes'] is not None else "all"
+        raw = (f"{image_digest}|{model_version}|{args['conf']:.4f}|{args['iou']:.4f}|"
+               f"{args['max_det']}|{classes}|{args['imgsz']}")
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _disk_path(self, key):
+        return self.disk_dir / key[:2] / f"{key}.npz"
+
+    def get(self, key):
+        """
+        Mengembalikan Detections untuk key, atau None jika belum ada di cache.
+        """
+        with self._lock:
+            detections = self._entries.get(key)
+            if detections is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.increment('result_cache_hits')
+                return detections
+
+        if self.disk_dir is not None:
+            path = self._disk_path(key)
+            if path.exists():
+                try:
+                    with np.load(path) as data:
+                        detections = Detections(data['xyxy'], data['conf'], data['cls'])
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Error membaca cache deteksi {path}: {str(e)}")
+                else:
+                    self._remember(key, detections)
+                    with self._lock:
+                        self.hits += 1
+                    metrics.increment('result_cache_hits')
+                    return detections
+
+        with self._lock:
+            self.misses += 1
+        metrics.increment('result_cache_misses')
+        return None
+
+    def put(self, key, detections):
+        """
+        Menyimpan Detections ke memori dan, jika diaktifkan, ke disk.
+        """
+        self._remember(key, detections)
+        if self.disk_dir is not None:
+            path = self._disk_path(key)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Nama sementara unik agar dua sesi yang menulis kunci yang sama tidak saling menimpa
+            temp_path = path.with_name(f".{path.stem}.{uuid.uuid4().hex}.tmp.npz")
+            np.savez(temp_path, xyxy=detections.xyxy, conf=detections.conf, cls=detections.cls)
+            os.replace(temp_path, path)  # Ganti secara atomik agar pembaca tidak melihat file setengah jadi
+            with self._lock:
+                self._puts_since_prune += 1
+                prune = self._puts_since_prune >= self.prune_every
+                if prune:
+                    self._puts_since_prune = 0
+            if prune:
+                self.prune_disk()
+
+    def prune_disk(self):
+        """
+        Menghapus file cache disk yang lebih tua dari disk_max_age_days, lalu file terlama
+        sampai jumlahnya paling banyak disk_max_entries. Mengembalikan jumlah file yang dihapus.
+        """
+        if self.disk_dir is None or (self.disk_max_entries is None and self.disk_max_age_days is None):
+            return 0
+        # Satu pemangkasan sekaligus; pemanggil lain tidak perlu menunggu
+        if not self._prune_lock.acquire(blocking=False):
+            return 0
+        try:
+            files = []
+            for path in self.disk_dir.glob('*/*.npz'):
+                try:
+                    files.append((path.stat().st_mtime, path))
+                except FileNotFoundError:
+                    pass
+            files.sort()
+            expired = 0
+            if self.disk_max_age_days is not None:
+                cutoff = time.time() - self.disk_max_age_days * 86400
+                expired = sum(1 for mtime, _ in files if mtime < cutoff)
+            if self.disk_max_entries is not None:
+                expired = max(expired, len(files) - self.disk_max_entries)
+            for _, path in files[:expired]:
+                path.unlink(missing_ok=True)
+            return expired
+        finally:
+            self._prune_lock.release()
+
+    def _remember(self, key, detections):
+        with self._lock:
+            self._entries[key] = detections
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_cache():
+    """
+    Mengembalikan DetectionCache bersama level proses sesuai konfigurasi di settings.
+    """
+    global _CACHE
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                _CACHE = DetectionCache(
+                    settings.RESULT_CACHE_SIZE, settings.RESULT_CACHE_DIR,
+                    settings.RESULT_CACHE_DISK_MAX_ENTRIES, settings.RESULT_CACHE_DISK_MAX_AGE_DAYS)
+    return _CACHE
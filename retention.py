@@ -0,0 +1,84 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+import settings
+
+
+class RetentionWorker:
+    """
+    Thread latar belakang yang menerapkan kebijakan retensi riwayat deteksi:
+    baris yang sudah "dihapus semua", lebih tua dari max_age_days, atau di luar max_rows terbaru
+    dihapus per chunk lewat DetectionStorage.purge_chunk. Setiap chunk adalah transaksi pendek di
+    antrean tulis, sehingga penyimpanan deteksi baru tetap berjalan di sela-selanya.
+    """
+
+    def __init__(self, storage, max_age_days=None, max_rows=None, interval_seconds=None,
+                 start=True):
+        self.storage = storage
+        self.max_age_days = max_age_days if max_age_days is not None else settings.HISTORY_MAX_AGE_DAYS
+        self.max_rows = max_rows if max_rows is not None else settings.HISTORY_MAX_ROWS
+        self.interval_seconds = interval_seconds or settings.RETENTION_INTERVAL_SECONDS
+        self.last_run = None
+        self.last_deleted = 0
+        self._wake_event = threading.Event()
+        self._thread = None
+        if start:
+            self._thread = threading.Thread(target=self._run, name="detection-retention", daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        """
+        Meminta pembersihan segera, misalnya setelah "hapus semua".
+        """
+        self._wake_event.set()
+
+    def _conditions(self):
+        """
+        Mengembalikan list (klausa where, params) untuk baris yang harus dihapus.
+        """
+        conditions = [("id <= ?", (self.storage.deleted_through_id,))]
+        if self.max_age_days:
+            cutoff = datetime.now() - timedelta(days=self.max_age_days)
+            conditions.append(("timestamp < ?", (cutoff.strftime('%Y-%m-%d %H:%M:%S'),)))
+        if self.max_rows:
+            # Baris terakhir yang masih boleh disimpan menurut urutan riwayat (terbaru dulu)
+            with self.storage.connection() as conn:
+                boundary = conn.execute(
+                    "SELECT timestamp, id FROM detections WHERE id > ? "
+                    "ORDER BY timestamp DESC, id DESC LIMIT 1 OFFSET ?",
+                    (self.storage.deleted_through_id, self.max_rows - 1)).fetchone()
+            if boundary is not None:
+                timestamp, id = boundary
+                conditions.append((
+                    "timestamp < ? OR (timestamp = ? AND id < ?)", (timestamp, timestamp, id)))
+        return conditions
+
+    def run_once(self):
+        """
+        Menghapus semua baris yang melanggar kebijakan secara bertahap, lalu menjalankan
+        incremental vacuum. Mengembalikan jumlah baris yang dihapus.
+        """
+        deleted = 0
+        for where, params in self._conditions():
+            while True:
+                count = self.storage.purge_chunk(where, params)
+                deleted += count
+                if count == 0:
+                    break
+                # Beri kesempatan antrean tulis memproses penyimpanan baru di antara chunk
+                time.sleep(settings.RETENTION_CHUNK_PAUSE_SECONDS)
+        if deleted:
+            self.storage.incremental_vacuum()
+        self.last_run = time.time()
+        self.last_deleted = deleted
+        return deleted
+
+    def _run(self):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Error retensi riwayat deteksi: {str(e)}")
+            self._wake_event.wait(self.interval_seconds)
+            self._wake_event.clear()
@@ -39,5 +39,141 @@ DETECTION_MODEL = MODEL_DIR / 'best.pt'
 
 SEGMENTATION_MODEL = MODEL_DIR / 'best.pt'
 
+# Backend inferensi: 'pytorch' (best.pt langsung), 'onnx', 'openvino' atau 'torchscript'.
+# Backend selain pytorch diekspor otomatis dari DETECTION_MODEL ke MODEL_DIR (lihat model_export.py)
+INFERENCE_BACKEND = 'onnx'
+# Ukuran input yang dipakai saat ekspor dan warm-up
+EXPORT_IMGSZ = 640
+
+# Device inferensi ('cpu', 'cuda:0', ...). None = dipilih otomatis oleh ultralytics
+DEVICE = None
+
+# Parameter NMS default untuk setiap model.predict (IoU, jumlah deteksi maksimum, filter indeks
+# kelas; None = semua). Model dipakai bersama semua sesi dan ultralytics mengingat argumen predict
+# sebelumnya, jadi semua parameter selalu diteruskan lengkap (imgsz default EXPORT_IMGSZ).
+PREDICT_IOU = 0.7
+PREDICT_MAX_DET = 300
+PREDICT_CLASSES = None
+
+# Unggah gambar
+# Jumlah gambar per batch inferensi dan jumlah thread untuk decode paralel
+UPLOAD_BATCH_SIZE = 8
+DECODE_WORKERS = 4
+# Sisi terpanjang gambar setelah decode (piksel). JPEG besar di-decode langsung pada resolusi
+# rendah (draft mode); tetap lebih besar dari EXPORT_IMGSZ agar pratinjau dan laporan tajam.
+# Diabaikan saat tiling aktif karena tiling membutuhkan resolusi penuh.
+INGEST_MAX_SIDE = 1280
+
+# Inferensi dengan irisan (tiling) untuk gambar resolusi tinggi: ukuran tile (piksel), rasio
+# tumpang tindih antar tile, dan penggabungan lintas tile ('iou' atau 'ios' = intersection over smaller)
+TILE_SIZE = 640
+TILE_OVERLAP = 0.2
+TILE_MERGE_METRIC = 'ios'
+TILE_MERGE_THRESHOLD = 0.5
+
+# Cache hasil deteksi (kunci: hash isi gambar + versi model + parameter inferensi)
+# Jumlah entri di memori (LRU) dan folder cache disk; None = hanya memori
+RESULT_CACHE_SIZE = 256
+RESULT_CACHE_DIR = ROOT / 'cache' / 'detections'
+# Batas file cache disk: jumlah file dan umur (hari); file terlama dihapus lebih dulu
+RESULT_CACHE_DISK_MAX_ENTRIES = 10000
+RESULT_CACHE_DISK_MAX_AGE_DAYS = 30
+
+# Penjelasan penyakit (Gemini)
+GEMINI_MODEL = "gemini-2.0-flash"
+# Penjelasan disimpan di SQLite dan dianggap kedaluwarsa setelah TTL (detik)
+EXPLANATION_DB = ROOT / 'explanations.db'
+EXPLANATION_TTL_SECONDS = 30 * 24 * 60 * 60
+# Jumlah thread untuk mengambil penjelasan dan untuk membangun PDF secara paralel
+EXPLANATION_WORKERS = 4
+PDF_WORKERS = 2
+
+# Laporan PDF: kualitas JPEG gambar yang disematkan (1-95)
+PDF_IMAGE_QUALITY = 85
+# Jumlah laporan PDF yang disimpan di cache (dibangun hanya saat diminta)
+PDF_CACHE_SIZE = 64
+# Thumbnail kotak deteksi pada laporan gabungan: lebar di PDF (mm) dan ukuran maksimum (piksel)
+REPORT_THUMBNAIL_MM = 40
+REPORT_THUMBNAIL_PX = 320
+
+# Database riwayat deteksi (SQLite, mode WAL)
+DETECTION_DB = ROOT / 'detection_paddy_leaves.db'
+# Jumlah maksimum koneksi baca dan ukuran cache halaman per koneksi (KB)
+DB_POOL_SIZE = 4
+DB_CACHE_KB = 16000
+# Penulisan digabung per transaksi: maksimum perintah per batch dan jendela tunggu (detik)
+DB_WRITE_BATCH_SIZE = 64
+DB_WRITE_FLUSH_SECONDS = 0.05
+
+# Gambar riwayat disimpan di disk dengan nama hash isi (format 'WEBP' atau 'JPEG' dan kualitasnya)
+IMAGE_STORE_DIR = ROOT / 'detection_images'
+IMAGE_STORE_FORMAT = 'WEBP'
+IMAGE_STORE_QUALITY = 90
+# Jumlah baris lama per chunk saat memindahkan BLOB gambar ke IMAGE_STORE_DIR
+DB_MIGRATION_CHUNK_SIZE = 50
+
+# Retensi riwayat: umur maksimum (hari) dan jumlah baris maksimum; None = tanpa batas.
+# Batas ini menghapus riwayat dan file gambarnya secara permanen, jadi harus diaktifkan sendiri
+# per deployment (misalnya 180 hari dan 10000 baris).
+HISTORY_MAX_AGE_DAYS = None
+HISTORY_MAX_ROWS = None
+# Pembersihan latar belakang: interval (detik), baris per chunk dan jeda antar chunk (detik)
+RETENTION_INTERVAL_SECONDS = 60 * 60
+RETENTION_CHUNK_SIZE = 500
+RETENTION_CHUNK_PAUSE_SECONDS = 0.05
+# Jumlah halaman kosong yang dikembalikan ke disk per pembersihan (PRAGMA incremental_vacuum)
+DB_INCREMENTAL_VACUUM_PAGES = 2000
+
+# Riwayat deteksi: jumlah item per halaman dan ukuran maksimum thumbnail (piksel)
+HISTORY_PAGE_SIZE = 20
+HISTORY_THUMBNAIL_SIZE = (160, 160)
+
+# Sumber Video/RTSP/YouTube: target laju inferensi (frame per detik), kapasitas ring buffer
+# frame, batas waktu tunggu frame (detik) dan jeda maksimum sambung ulang RTSP (detik)
+STREAM_TARGET_FPS = 5
+STREAM_BUFFER_SIZE = 4
+STREAM_READ_TIMEOUT_SECONDS = 1.0
+RTSP_RECONNECT_MAX_SECONDS = 30
+DEFAULT_RTSP_URL = 'rtsp://'
+
+# Mode tracking (webcam dan sumber video): file konfigurasi tracker ultralytics, deteksi penuh
+# setiap N frame, bobot EMA confidence per track, jumlah kemunculan minimum agar track dihitung,
+# dan jumlah frame deteksi sebelum status track yang hilang dibuang
+TRACKER_TYPE = 'bytetrack.yaml'
+TRACK_DETECT_EVERY = 3
+TRACK_CONF_EMA_ALPHA = 0.3
+TRACK_MIN_HITS = 3
+TRACK_MAX_LOST = 30
+
+# Folder hasil default untuk batch_detect.py (deteksi batch tanpa Streamlit)
+BATCH_OUTPUT_DIR = ROOT / 'batch_output'
+
+# Instrumentasi: durasi per tahap dan counter (lihat metrics.py). Panel diagnostik dibuka dengan
+# ?diagnostics=1 pada URL; METRICS_PORT (misalnya 9100) mengaktifkan endpoint /metrics Prometheus
+# yang hanya mendengarkan di METRICS_HOST ('0.0.0.0' = semua antarmuka jaringan)
+METRICS_ENABLED = True
+METRICS_PORT = None
+METRICS_HOST = '127.0.0.1'
+
 # Webcam
 WEBCAM_PATH = 0
+# Target laju inferensi webcam (frame per detik); frame di antaranya hanya digambar ulang
+WEBCAM_TARGET_FPS = 8
+# Parameter NMS default untuk webcam (IoU, jumlah deteksi maksimum, filter indeks kelas; None = semua)
+WEBCAM_IOU = 0.7
+WEBCAM_MAX_DET = 100
+WEBCAM_CLASSES = None
+
+# Resolusi adaptif webcam: target latensi end-to-end (ms), pilihan sisi terpanjang frame proses
+# (piksel, kelipatan MODEL_STRIDE), rentang laju inferensi (FPS), bobot EMA latensi, ambang rasio
+# latensi/target untuk turun/naik level dan jumlah sampel jeda setelah setiap perubahan.
+# Backend yang diekspor tanpa ukuran input dinamis (torchscript) selalu memakai EXPORT_IMGSZ.
+MODEL_STRIDE = 32
+ADAPTIVE_TARGET_LATENCY_MS = 200
+ADAPTIVE_RESOLUTION_LEVELS = [256, 320, 384, 448, 512, 576, 640]
+ADAPTIVE_MIN_FPS = 2
+ADAPTIVE_MAX_FPS = 15
+ADAPTIVE_EMA_ALPHA = 0.3
+ADAPTIVE_HIGH_RATIO = 1.1
+ADAPTIVE_LOW_RATIO = 0.7
+ADAPTIVE_COOLDOWN_SAMPLES = 5
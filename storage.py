@@ -0,0 +1,565 @@
+import argparse
+import atexit
+import io
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime
+
+import PIL.Image as Image
+
+import metrics
+import retention
+import settings
+from image_store import ImageStore
+
+
+def _migration_initial(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS detections
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  timestamp TEXT,
+                  image BLOB)''')
+
+
+def _migration_history_thumbnails(conn):
+    # Database lama dibuat tanpa kolom thumbnail
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(detections)")]
+    if 'thumbnail' not in columns:
+        conn.execute("ALTER TABLE detections ADD COLUMN thumbnail BLOB")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_detections_timestamp ON detections (timestamp, id)")
+
+
+def _migration_structured_records(conn):
+    # Metadata deteksi dan satu baris per kotak agar statistik cukup dihitung dengan SQL
+    conn.execute("ALTER TABLE detections ADD COLUMN source_name TEXT")
+    conn.execute("ALTER TABLE detections ADD COLUMN model_version TEXT")
+    conn.execute("ALTER TABLE detections ADD COLUMN confidence_threshold REAL")
+    conn.execute('''CREATE TABLE IF NOT EXISTS detection_boxes
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  detection_id INTEGER NOT NULL REFERENCES detections (id) ON DELETE CASCADE,
+                  label TEXT NOT NULL,
+                  confidence REAL NOT NULL,
+                  x1 REAL, y1 REAL, x2 REAL, y2 REAL)''')
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_detection_boxes_label ON detection_boxes (label, detection_id)")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_detection_boxes_detection ON detection_boxes (detection_id)")
+
+
+def _migration_image_refs(conn):
+    # Gambar dipindah ke ImageStore; kolom image hanya tersisa untuk baris lama
+    conn.execute("ALTER TABLE detections ADD COLUMN original_ref TEXT")
+    conn.execute("ALTER TABLE detections ADD COLUMN annotated_ref TEXT")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_detections_original_ref ON detections (original_ref)")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_detections_annotated_ref ON detections (annotated_ref)")
+
+
+def _migration_storage_meta(conn):
+    # Nilai kecil milik storage, misalnya batas id untuk "hapus semua"
+    conn.execute('''CREATE TABLE IF NOT EXISTS storage_meta
+                 (key TEXT PRIMARY KEY,
+                  value)''')
+
+
+# Migrasi skema berurutan; versi yang sudah dijalankan dicatat di PRAGMA user_version.
+# Tambahkan migrasi baru di akhir list, jangan mengubah urutan yang sudah ada.
+MIGRATIONS = [
+    _migration_initial,
+    _migration_history_thumbnails,
+    _migration_structured_records,
+    _migration_image_refs,
+    _migration_storage_meta,
+]
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _format_timestamp(value):
+    return value.strftime(TIMESTAMP_FORMAT) if isinstance(value, datetime) else value
+
+
+def _time_filter(since, until, column='d.timestamp'):
+    """
+    Membuat klausa WHERE untuk rentang waktu [since, until); keduanya opsional.
+    """
+    clauses, params = [], []
+    if since is not None:
+        clauses.append(f"{column} >= ?")
+        params.append(_format_timestamp(since))
+    if until is not None:
+        clauses.append(f"{column} < ?")
+        params.append(_format_timestamp(until))
+    return clauses, params
+
+
+def make_thumbnail(image):
+    """
+    Membuat thumbnail JPEG kecil untuk daftar riwayat.
+    """
+    thumbnail = image.convert('RGB')
+    thumbnail.thumbnail(settings.HISTORY_THUMBNAIL_SIZE)
+    thumb_byte_arr = io.BytesIO()
+    thumbnail.save(thumb_byte_arr, format='JPEG', quality=80)
+    return thumb_byte_arr.getvalue()
+
+
+class DetectionStorage:
+    """
+    Penyimpanan riwayat deteksi berbasis SQLite dalam mode WAL.
+    Pembacaan memakai pool koneksi sehingga bisa berjalan bersamaan dari beberapa thread Streamlit;
+    semua penulisan dilewatkan ke satu thread penulis yang menggabungkan beberapa perintah ke dalam
+    satu transaksi, sehingga tidak ada "database is locked" maupun fsync per insert.
+
+    "Hapus semua" hanya mencatat id terbesar saat itu (deleted_through_id); baris dengan id
+    tersebut atau lebih kecil langsung tersembunyi dari semua query dan dihapus fisik secara
+    bertahap oleh retention.RetentionWorker.
+    """
+
+    def __init__(self, db_path=None, pool_size=None, batch_size=None, flush_seconds=None,
+                 image_store=None):
+        self.db_path = str(db_path if db_path is not None else settings.DETECTION_DB)
+        self.image_store = image_store if image_store is not None else ImageStore()
+        self.batch_size = batch_size or settings.DB_WRITE_BATCH_SIZE
+        self.flush_seconds = flush_seconds if flush_seconds is not None else settings.DB_WRITE_FLUSH_SECONDS
+        self._pool = queue.LifoQueue()
+        self._pool_size = pool_size or settings.DB_POOL_SIZE
+        self._pool_created = 0
+        self._pool_lock = threading.Lock()
+        self.retention_worker = None
+
+        self._migrate()
+        with self.connection() as conn:
+            row = conn.execute(
+                "SELECT value FROM storage_meta WHERE key = 'deleted_through_id'").fetchone()
+        self.deleted_through_id = row[0] if row is not None else 0
+
+        self._writes = queue.Queue()
+        self._writer = threading.Thread(target=self._run_writer, name="detection-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        # isolation_level=None: transaksi diatur sendiri dengan BEGIN/COMMIT
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        # Harus sebelum journal_mode agar langsung berlaku di database baru; database lama
+        # membutuhkan satu VACUUM penuh (lihat enable_incremental_vacuum)
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # Aman di mode WAL, fsync hanya saat checkpoint
+        conn.execute(f"PRAGMA cache_size=-{settings.DB_CACHE_KB}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA busy_timeout=30000")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def _migrate(self):
+        """
+        Menjalankan migrasi yang belum diterapkan, sekali saat storage dibuat.
+        """
+        conn = self._connect()
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    migration(conn)
+                    conn.execute(f"PRAGMA user_version = {number}")
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+
+            # VACUUM penuh bisa lama pada database besar, jadi tidak dijalankan saat aplikasi dimulai
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                print(f"Database {self.db_path} belum memakai auto_vacuum=INCREMENTAL; ruang dari "
+                      "riwayat terhapus tidak dikembalikan sampai 'python storage.py --vacuum' dijalankan.")
+        finally:
+            conn.close()
+
+    def enable_incremental_vacuum(self):
+        """
+        Mengaktifkan auto_vacuum=INCREMENTAL pada database lama dengan satu VACUUM penuh, agar ruang
+        dari baris terhapus bisa dikembalikan sedikit demi sedikit oleh incremental_vacuum.
+        Bisa memakan waktu lama pada database besar; jalankan lewat CLI saat aplikasi tidak sibuk.
+        """
+        conn = self._connect()
+        try:
+            conn.execute("VACUUM")
+            return conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        finally:
+            conn.close()
+
+    @contextmanager
+    def connection(self):
+        """
+        Meminjam satu koneksi baca dari pool dan mengembalikannya setelah selesai.
+        """
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._pool_lock:
+                can_create = self._pool_created < self._pool_size
+                if can_create:
+                    self._pool_created += 1
+            conn = self._connect() if can_create else self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def submit_write(self, write_fn):
+        """
+        Mengantrekan fungsi write_fn(conn) yang dijalankan di thread penulis di dalam transaksi
+        bersama. Mengembalikan Future berisi nilai kembalian write_fn.
+        """
+        future = Future()
+        self._writes.put((write_fn, future))
+        return future
+
+    def execute_write(self, sql, params=()):
+        """
+        Mengantrekan satu perintah tulis. Mengembalikan Future berisi lastrowid.
+        """
+        return self.submit_write(lambda conn: conn.execute(sql, params).lastrowid)
+
+    def flush(self, timeout=None):
+        """
+        Menunggu sampai semua penulisan yang sudah diantrekan selesai di-commit.
+        """
+        self.submit_write(lambda conn: None).result(timeout)
+
+    def _run_writer(self):
+        conn = self._connect()
+        while True:
+            batch = [self._writes.get()]
+            # Kumpulkan perintah lain yang datang dalam jendela flush_seconds
+            deadline = time.monotonic() + self.flush_seconds
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._writes.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            # Error tak terduga dilaporkan ke Future milik batch ini; thread penulis tetap hidup
+            # karena tanpa thread ini semua penulisan berikutnya menunggu selamanya
+            try:
+                with metrics.span('db_write_batch'):
+                    self._write_batch(conn, batch)
+            except Exception as e:
+                print(f"Error thread penulis riwayat deteksi: {str(e)}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            metrics.increment('db_writes', len(batch))
+
+    @staticmethod
+    def _write_batch(conn, batch):
+        results = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for write_fn, _ in batch:
+                results.append(write_fn(conn))
+            conn.execute("COMMIT")
+        except Exception as e:
+            # Beberapa error (misalnya disk penuh) sudah mengakhiri transaksi sendiri
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # Ulangi satu per satu agar hanya perintah yang gagal yang melaporkan error
+            for item in batch:
+                DetectionStorage._write_batch(conn, [item])
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+    def save_detection(self, image, detections=None, names=None, model_version=None,
+                       confidence=None, source_name=None, original_image=None):
+        """
+        Mengantrekan penyimpanan gambar hasil deteksi beserta thumbnail-nya dan, jika diberikan,
+        gambar asli serta kotak-kotak inference.Detections (label diambil dari names) dalam satu
+        transaksi. Gambar ditulis ke ImageStore; database hanya menyimpan referensinya.
+        Mengembalikan Future berisi id baris baru.
+        """
+        timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+        with metrics.span('save_detection_encode'):
+            annotated_ref = self.image_store.put(image)
+            original_ref = self.image_store.put(original_image) if original_image is not None else None
+            thumbnail = make_thumbnail(image)
+        row = (timestamp, thumbnail, original_ref, annotated_ref,
+               source_name, model_version, confidence)
+        boxes = []
+        if detections is not None:
+            boxes = [(names[c], conf, x1, y1, x2, y2) for (x1, y1, x2, y2), conf, c in zip(
+                detections.xyxy.tolist(), detections.conf.tolist(), detections.cls.tolist())]
+
+        def write(conn):
+            # purge_chunk menghapus file yatim di thread penulis ini; file yang sudah ada saat put
+            # (deduplikasi) bisa terhapus sebelum baris ini tersimpan, jadi tulis ulang jika hilang
+            for ref, source in ((annotated_ref, image), (original_ref, original_image)):
+                if ref is not None and not self.image_store.path(ref).exists():
+                    self.image_store.put(source)
+            detection_id = conn.execute(
+                "INSERT INTO detections (timestamp, thumbnail, original_ref, annotated_ref, "
+                "source_name, model_version, confidence_threshold) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                row).lastrowid
+            conn.executemany(
+                "INSERT INTO detection_boxes (detection_id, label, confidence, x1, y1, x2, y2) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(detection_id,) + box for box in boxes])
+            return detection_id
+
+        return self.submit_write(write)
+
+    def load_detection_boxes(self, detection_id):
+        """
+        Memuat kotak deteksi (label, confidence, (x1, y1, x2, y2)) untuk satu riwayat.
+        """
+        with self.connection() as conn:
+            rows = conn.execute(
+                "SELECT label, confidence, x1, y1, x2, y2 FROM detection_boxes "
+                "WHERE detection_id = ? ORDER BY confidence DESC", (detection_id,)).fetchall()
+        return [(label, conf, (x1, y1, x2, y2)) for label, conf, x1, y1, x2, y2 in rows]
+
+    def label_counts(self, since=None, until=None, min_confidence=None):
+        """
+        Statistik per label dalam rentang waktu [since, until) (datetime atau teks timestamp).
+        Mengembalikan list (label, jumlah_kotak, jumlah_gambar, rata-rata_confidence),
+        diurutkan dari jumlah kotak terbanyak.
+        """
+        clauses, params = _time_filter(since, until)
+        clauses.append("d.id > ?")
+        params.append(self.deleted_through_id)
+        if min_confidence is not None:
+            clauses.append("b.confidence >= ?")
+            params.append(min_confidence)
+        where = f"WHERE {' AND '.join(clauses)}"
+        with self.connection() as conn:
+            return conn.execute(
+                "SELECT b.label, COUNT(*), COUNT(DISTINCT b.detection_id), AVG(b.confidence) "
+                "FROM detection_boxes b JOIN detections d ON d.id = b.detection_id "
+                f"{where} GROUP BY b.label ORDER BY COUNT(*) DESC", params).fetchall()
+
+    def daily_counts(self, label=None, since=None, until=None):
+        """
+        Jumlah kotak per hari (dan per label) dalam rentang waktu [since, until).
+        Mengembalikan list (tanggal 'YYYY-MM-DD', label, jumlah_kotak) berurutan menurut tanggal.
+        """
+        clauses, params = _time_filter(since, until)
+        clauses.append("d.id > ?")
+        params.append(self.deleted_through_id)
+        if label is not None:
+            clauses.append("b.label = ?")
+            params.append(label)
+        where = f"WHERE {' AND '.join(clauses)}"
+        with self.connection() as conn:
+            return conn.execute(
+                "SELECT substr(d.timestamp, 1, 10) AS day, b.label, COUNT(*) "
+                "FROM detection_boxes b JOIN detections d ON d.id = b.detection_id "
+                f"{where} GROUP BY day, b.label ORDER BY day, b.label", params).fetchall()
+
+    def count_detections(self):
+        """
+        Menghitung jumlah riwayat deteksi.
+        """
+        with self.connection() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM detections WHERE id > ?",
+                (self.deleted_through_id,)).fetchone()[0]
+
+    def load_detection_history(self, cursor=None, limit=None):
+        """
+        Memuat satu halaman riwayat deteksi (id, timestamp, thumbnail).
+        Memakai keyset pagination: cursor adalah (timestamp, id) baris terakhir halaman sebelumnya.
+        """
+        limit = limit or settings.HISTORY_PAGE_SIZE
+        with self.connection() as conn:
+            if cursor is None:
+                rows = conn.execute(
+                    "SELECT id, timestamp, thumbnail FROM detections WHERE id > ? "
+                    "ORDER BY timestamp DESC, id DESC LIMIT ?",
+                    (self.deleted_through_id, limit)).fetchall()
+            else:
+                last_timestamp, last_id = cursor
+                rows = conn.execute(
+                    "SELECT id, timestamp, thumbnail FROM detections "
+                    "WHERE (timestamp < ? OR (timestamp = ? AND id < ?)) AND id > ? "
+                    "ORDER BY timestamp DESC, id DESC LIMIT ?",
+                    (last_timestamp, last_timestamp, last_id, self.deleted_through_id,
+                     limit)).fetchall()
+
+        # Baris lama belum punya thumbnail: buat sekali dari gambar penuh lalu simpan
+        history = []
+        for id, timestamp, thumbnail in rows:
+            if thumbnail is None:
+                image = self.load_detection_image(id)
+                if image is not None:
+                    thumbnail = make_thumbnail(image)
+                    self.execute_write(
+                        "UPDATE detections SET thumbnail = ? WHERE id = ?", (thumbnail, id))
+            history.append((id, timestamp, thumbnail))
+        return history
+
+    def load_detection_image(self, detection_id):
+        """
+        Memuat gambar hasil deteksi ukuran penuh untuk satu riwayat.
+        """
+        with self.connection() as conn:
+            row = conn.execute(
+                "SELECT annotated_ref, image FROM detections WHERE id = ?",
+                (detection_id,)).fetchone()
+        if row is None:
+            return None
+        annotated_ref, image = row
+        if annotated_ref is not None:
+            return self.image_store.get(annotated_ref)
+        # Baris lama yang belum dipindah dari BLOB
+        return Image.open(io.BytesIO(image)) if image is not None else None
+
+    def load_original_image(self, detection_id):
+        """
+        Memuat gambar asli (sebelum kotak digambar) untuk satu riwayat, jika disimpan.
+        """
+        with self.connection() as conn:
+            row = conn.execute(
+                "SELECT original_ref FROM detections WHERE id = ?", (detection_id,)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return self.image_store.get(row[0])
+
+    def migrate_legacy_images(self, chunk_size=None):
+        """
+        Memindahkan BLOB PNG dari baris lama ke ImageStore secara bertahap per chunk, lalu
+        mengosongkan kolom image. Baris dengan BLOB rusak dilewati (tetap di database) tanpa
+        menghentikan migrasi. Mengembalikan jumlah baris yang dipindahkan.
+        """
+        chunk_size = chunk_size or settings.DB_MIGRATION_CHUNK_SIZE
+        moved = 0
+        last_id = 0
+        while True:
+            # Urut id agar baris yang dilewati tidak diambil lagi di chunk berikutnya
+            with self.connection() as conn:
+                rows = conn.execute(
+                    "SELECT id, image FROM detections WHERE image IS NOT NULL AND id > ? "
+                    "ORDER BY id LIMIT ?", (last_id, chunk_size)).fetchall()
+            if not rows:
+                return moved
+            last_id = rows[-1][0]
+            updates = []
+            for id, image in rows:
+                try:
+                    updates.append((self.image_store.put(Image.open(io.BytesIO(image))), id))
+                except Exception as e:
+                    print(f"Error memindahkan gambar riwayat {id} ke ImageStore, dilewati: {str(e)}")
+            if updates:
+                self.submit_write(lambda conn: conn.executemany(
+                    "UPDATE detections SET annotated_ref = ?, image = NULL WHERE id = ?",
+                    updates)).result()
+            moved += len(updates)
+
+    def delete_all_detections(self):
+        """
+        Menyembunyikan semua riwayat deteksi dalam O(1) dengan mencatat id terbesar saat ini.
+        Baris dan file gambarnya dihapus fisik di latar belakang oleh purge_chunk.
+        """
+        def write(conn):
+            max_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM detections").fetchone()[0]
+            conn.execute(
+                "INSERT OR REPLACE INTO storage_meta (key, value) VALUES ('deleted_through_id', ?)",
+                (max_id,))
+            return max_id
+
+        self.deleted_through_id = self.submit_write(write).result()
+        if self.retention_worker is not None:
+            self.retention_worker.wake()
+
+    def purge_chunk(self, where, params=(), chunk_size=None):
+        """
+        Menghapus fisik paling banyak chunk_size baris detections yang memenuhi klausa where
+        (beserta kotaknya) dalam satu transaksi, lalu menghapus file gambar yang tidak lagi
+        direferensikan. Mengembalikan jumlah baris yang dihapus.
+
+        File dihapus di thread penulis setelah transaksi hapus di-commit, dengan status yatim
+        diperiksa ulang saat itu; save_detection menulis ulang file yang hilang sebelum INSERT,
+        sehingga baris baru yang dideduplikasi ke file yang sama tidak pernah menunjuk file terhapus.
+        """
+        chunk_size = chunk_size or settings.RETENTION_CHUNK_SIZE
+
+        def write(conn):
+            rows = conn.execute(
+                f"SELECT id, original_ref, annotated_ref FROM detections WHERE {where} LIMIT ?",
+                tuple(params) + (chunk_size,)).fetchall()
+            if not rows:
+                return 0, []
+            ids = [(row[0],) for row in rows]
+            conn.executemany("DELETE FROM detection_boxes WHERE detection_id = ?", ids)
+            conn.executemany("DELETE FROM detections WHERE id = ?", ids)
+            return len(rows), {ref for row in rows for ref in row[1:] if ref is not None}
+
+        def delete_orphans(conn):
+            # File yang sama bisa dipakai beberapa baris (deduplikasi); hapus hanya yang yatim
+            for ref in refs:
+                if conn.execute(
+                        "SELECT 1 FROM detections WHERE original_ref = ? OR annotated_ref = ? LIMIT 1",
+                        (ref, ref)).fetchone() is None:
+                    self.image_store.delete(ref)
+
+        deleted, refs = self.submit_write(write).result()
+        if refs:
+            self.submit_write(delete_orphans).result()
+        return deleted
+
+    def incremental_vacuum(self, pages=None):
+        """
+        Mengembalikan paling banyak pages halaman kosong ke sistem berkas.
+        """
+        pages = pages or settings.DB_INCREMENTAL_VACUUM_PAGES
+        # execute() hanya menjalankan satu langkah pragma ini (satu halaman); executescript
+        # menjalankannya sampai selesai. Dijalankan di luar transaksi thread penulis karena
+        # executescript meng-commit transaksi yang sedang terbuka.
+        with self.connection() as conn:
+            conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+
+
+_STORAGE = None
+_STORAGE_LOCK = threading.Lock()
+
+
+def get_storage():
+    """
+    Mengembalikan DetectionStorage bersama level proses sesuai konfigurasi di settings.
+    """
+    global _STORAGE
+    if _STORAGE is None:
+        with _STORAGE_LOCK:
+            if _STORAGE is None:
+                _STORAGE = DetectionStorage()
+                # Pastikan antrean tulis dikosongkan sebelum proses berhenti
+                atexit.register(_STORAGE.flush, 10)
+                threading.Thread(
+                    target=_STORAGE.migrate_legacy_images, name="detection-image-migration",
+                    daemon=True).start()
+                _STORAGE.retention_worker = retention.RetentionWorker(_STORAGE)
+    return _STORAGE
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Perawatan database riwayat deteksi.")
+    parser.add_argument('--db', default=str(settings.DETECTION_DB), help="Path file database")
+    parser.add_argument('--vacuum', action='store_true',
+                        help="Jalankan VACUUM penuh sekali agar auto_vacuum=INCREMENTAL berlaku")
+    args = parser.parse_args()
+
+    if args.vacuum:
+        enabled = DetectionStorage(args.db).enable_incremental_vacuum()
+        print(f"VACUUM selesai, auto_vacuum=INCREMENTAL {'aktif' if enabled else 'TIDAK aktif'}")
+    else:
+        parser.print_help()
@@ -0,0 +1,88 @@
+import numpy as np
+
+import inference
+import settings
+
+
+def tile_windows(width, height, tile_size, overlap):
+    """
+    Membagi gambar menjadi jendela (x1, y1, x2, y2) berukuran tile_size yang saling tumpang tindih
+    sebesar overlap (rasio 0-1). Jendela terakhir di setiap sumbu digeser agar pas dengan tepi gambar.
+    """
+    step = max(1, int(tile_size * (1 - overlap)))
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, step))
+        positions.append(length - tile_size)
+        return positions
+
+    return [(x, y, min(x + tile_size, width), min(y + tile_size, height))
+            for y in starts(height) for x in starts(width)]
+
+
+def nms(xyxy, conf, cls, threshold, metric='iou'):
+    """
+    NMS per kelas dalam NumPy. metric 'iou' memakai intersection over union; 'ios' memakai
+    intersection over smaller, yang juga menggabungkan potongan lesi di tepi tile dengan kotak
+    utuhnya. Mengembalikan indeks kotak yang dipertahankan, urut confidence menurun.
+    """
+    if len(conf) == 0:
+        return np.zeros(0, dtype=int)
+    # Geser kotak per kelas agar kotak dari kelas berbeda tidak pernah tumpang tindih
+    offset = (cls.astype(np.float32) * (xyxy.max() + 1))[:, None]
+    boxes = xyxy + offset
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    order = np.argsort(-conf)
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        w = np.clip(np.minimum(boxes[i, 2], boxes[rest, 2]) - np.maximum(boxes[i, 0], boxes[rest, 0]), 0, None)
+        h = np.clip(np.minimum(boxes[i, 3], boxes[rest, 3]) - np.maximum(boxes[i, 1], boxes[rest, 1]), 0, None)
+        inter = w * h
+        if metric == 'ios':
+            overlap = inter / np.maximum(np.minimum(areas[i], areas[rest]), 1e-6)
+        else:
+            overlap = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-6)
+        order = rest[overlap <= threshold]
+    return np.array(keep, dtype=int)
+
+
+def predict_tiled(model, image, confidence, tile_size=None, overlap=None, batch_size=None,
+                  lock=None):
+    """
+    Deteksi dengan irisan (sliced inference) untuk gambar resolusi tinggi.
+    Tile yang saling tumpang tindih diinferensi dalam batch, ditambah satu inferensi gambar penuh
+    untuk lesi besar, lalu semua kotak dikembalikan ke koordinat resolusi asli dan digabung dengan
+    NMS lintas tile. Gambar yang tidak lebih besar dari tile_size tidak dipotong.
+    image adalah PIL Image atau array NumPy RGB. Mengembalikan inference.Detections.
+    """
+    tile_size = tile_size or settings.TILE_SIZE
+    overlap = overlap if overlap is not None else settings.TILE_OVERLAP
+    array = np.asarray(image)
+    height, width = array.shape[:2]
+
+    if width <= tile_size and height <= tile_size:
+        for _, results in inference.predict_batches(model, [image], confidence, 1, lock):
+            return inference.boxes_to_arrays(results[0])
+
+    windows = tile_windows(width, height, tile_size, overlap)
+    # Crop berupa view tanpa menyalin piksel
+    images = [array] + [array[y1:y2, x1:x2] for x1, y1, x2, y2 in windows]
+    offsets = [(0, 0)] + [(x1, y1) for x1, y1, _, _ in windows]
+
+    xyxy, conf, cls = [], [], []
+    for start, results in inference.predict_batches(model, images, confidence, batch_size, lock):
+        for offset, result in enumerate(results):
+            detections = inference.boxes_to_arrays(result)
+            x, y = offsets[start + offset]
+            xyxy.append(detections.xyxy + np.array([x, y, x, y], dtype=np.float32))
+            conf.append(detections.conf)
+            cls.append(detections.cls)
+
+    xyxy, conf, cls = np.concatenate(xyxy), np.concatenate(conf), np.concatenate(cls)
+    keep = nms(xyxy, conf, cls, settings.TILE_MERGE_THRESHOLD, settings.TILE_MERGE_METRIC)
+    return inference.Detections(xyxy[keep], conf[keep], cls[keep])
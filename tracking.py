@@ -0,0 +1,160 @@
+from collections import Counter
+from types import SimpleNamespace
+
+import numpy as np
+
+import inference
+import settings
+
+
+def create_tracker(tracker_type, frame_rate):
+    """
+    Membuat tracker ultralytics (BYTETrack atau BoT-SORT) dari file konfigurasi YAML bawaan,
+    sama seperti yang dilakukan model.track(), tetapi milik satu sesi saja sehingga model
+    bersama tidak menyimpan state tracking.
+    """
+    import yaml
+    from ultralytics.trackers.bot_sort import BOTSORT
+    from ultralytics.trackers.byte_tracker import BYTETracker
+    from ultralytics.utils.checks import check_yaml
+
+    with open(check_yaml(tracker_type)) as f:
+        cfg = SimpleNamespace(**yaml.safe_load(f))
+    tracker_class = {'bytetrack': BYTETracker, 'botsort': BOTSORT}[cfg.tracker_type]
+    return tracker_class(args=cfg, frame_rate=frame_rate)
+
+
+class TrackState:
+    """
+    Status satu track: kotak terakhir, kecepatan per langkah, voting kelas dan EMA confidence.
+    """
+
+    def __init__(self, track_id, box, confidence, cls, step):
+        self.track_id = track_id
+        self.box = box
+        self.velocity = np.zeros(4, dtype=np.float32)
+        self.confidence = confidence
+        self.class_votes = Counter({cls: 1})
+        self.hits = 1
+        self.step = step
+
+    @property
+    def cls(self):
+        return self.class_votes.most_common(1)[0][0]
+
+    def update(self, box, confidence, cls, step, alpha):
+        if step > self.step:
+            self.velocity = (box - self.box) / (step - self.step)
+        self.box = box
+        self.confidence = alpha * confidence + (1 - alpha) * self.confidence
+        self.class_votes[cls] += 1
+        self.hits += 1
+        self.step = step
+
+
+class TrackingSession:
+    """
+    Mode tracking untuk satu stream (webcam atau sumber video).
+    Deteksi penuh hanya dijalankan setiap detect_every frame dan hasilnya diberikan ke tracker
+    sesi ini; di antara frame deteksi kotak setiap track diteruskan dengan kecepatan terakhirnya.
+    Confidence setiap track dihaluskan dengan EMA dan kelasnya ditentukan dengan voting.
+    """
+
+    def __init__(self, model, lock=None, tracker_type=None, detect_every=None, ema_alpha=None,
+                 frame_rate=None):
+        self.model = model
+        self.lock = lock
+        self.tracker_type = tracker_type or settings.TRACKER_TYPE
+        self.detect_every = detect_every or settings.TRACK_DETECT_EVERY
+        self.ema_alpha = ema_alpha or settings.TRACK_CONF_EMA_ALPHA
+        frame_rate = frame_rate or settings.WEBCAM_TARGET_FPS
+        # Tracker hanya melihat frame deteksi, jadi laju frame-nya ikut dibagi detect_every
+        self.tracker = create_tracker(
+            self.tracker_type, max(1, round(frame_rate / self.detect_every)))
+        self.tracks = {}
+        self.active_ids = []
+        # Kelas terakhir setiap track yang sudah terkonfirmasi (terlihat minimal TRACK_MIN_HITS kali)
+        self.confirmed = {}
+        self.step = -1
+        self.detection_steps = 0
+
+    def update(self, img, confidence, iou=None, max_det=None, classes=None, resize_dim=None,
+               imgsz=None):
+        """
+        Memproses satu frame BGR dan mengembalikan (Detections, track_ids) pada resolusi asli.
+        """
+        self.step += 1
+        if self.step % self.detect_every == 0:
+            self._detect(img, confidence, iou, max_det, classes, resize_dim, imgsz)
+        return self.current()
+
+    def _detect(self, img, confidence, iou, max_det, classes, resize_dim, imgsz):
+        detections = inference.detect_frame(
+            self.model, img, confidence, iou=iou, max_det=max_det, classes=classes,
+            resize_dim=resize_dim, lock=self.lock, imgsz=imgsz)
+        self.detection_steps += 1
+
+        tracks = self.tracker.update(_TrackerInput(detections), img)
+        self.active_ids = []
+        # Kolom hasil tracker ultralytics: x1, y1, x2, y2, track_id, score, cls, idx
+        for x1, y1, x2, y2, track_id, score, cls, _ in tracks.tolist():
+            track_id, cls = int(track_id), int(cls)
+            box = np.array([x1, y1, x2, y2], dtype=np.float32)
+            state = self.tracks.get(track_id)
+            if state is None:
+                state = self.tracks[track_id] = TrackState(track_id, box, score, cls, self.step)
+            else:
+                state.update(box, score, cls, self.step, self.ema_alpha)
+            if state.hits >= settings.TRACK_MIN_HITS:
+                self.confirmed[track_id] = state.cls
+            self.active_ids.append(track_id)
+
+        # Buang status track yang sudah lama hilang (tracker juga sudah melepasnya)
+        max_lost_steps = self.detect_every * settings.TRACK_MAX_LOST
+        for track_id in [track_id for track_id, state in self.tracks.items()
+                         if self.step - state.step > max_lost_steps]:
+            del self.tracks[track_id]
+
+    def current(self):
+        """
+        Mengembalikan (Detections, track_ids) untuk track aktif, diekstrapolasi ke langkah saat ini.
+        """
+        states = [self.tracks[track_id] for track_id in self.active_ids]
+        if not states:
+            return inference.Detections(
+                np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32),
+                np.zeros(0, dtype=int)), []
+        xyxy = np.stack([state.box + state.velocity * (self.step - state.step) for state in states])
+        conf = np.array([state.confidence for state in states], dtype=np.float32)
+        cls = np.array([state.cls for state in states], dtype=int)
+        return inference.Detections(xyxy, conf, cls), [state.track_id for state in states]
+
+    def track_counts(self, names):
+        """
+        Jumlah track unik terkonfirmasi per label sejak sesi dimulai.
+        """
+        return dict(Counter(names[cls] for cls in self.confirmed.values()))
+
+
+class _TrackerInput:
+    """
+    Adaptor Detections ke atribut yang dibaca tracker ultralytics (xyxy, xywh, conf, cls).
+    """
+
+    def __init__(self, detections):
+        self.xyxy = detections.xyxy
+        self.conf = detections.conf
+        self.cls = detections.cls.astype(np.float32)
+        xy = (self.xyxy[:, :2] + self.xyxy[:, 2:]) / 2
+        wh = self.xyxy[:, 2:] - self.xyxy[:, :2]
+        self.xywh = np.concatenate([xy, wh], axis=1)
+
+    def __len__(self):
+        return len(self.conf)
+
+    def __getitem__(self, index):
+        # Tracker mengambil subset deteksi (misalnya confidence tinggi/rendah) dengan mask
+        subset = _TrackerInput.__new__(_TrackerInput)
+        subset.xyxy, subset.conf, subset.cls, subset.xywh = (
+            self.xyxy[index], self.conf[index], self.cls[index], self.xywh[index])
+        return subset